@@ -3,18 +3,30 @@
 import streamlit as st
 import os
 import tempfile
-import zipfile
 from rag_core import (
     load_and_split_documents,
+    merge_split_results,
     index_documents,
     ingest_files,
     query_rag,
     clear_database,
+    MODEL_NAME,
+    EMBEDDING_MODEL,
 )
+from zip_ingest import load_and_split_zip, iter_zip_members
+from kb_index import get_kb_index, invalidate_kb_index, list_folders
+from ollama_clients import warm_models_async, get_queue_stats
+
+# When set, chat, ingestion and resets go to the shared query service, which
+# is then the only process writing to the index (see query_service.py)
+QUERY_SERVICE_URL = os.environ.get("QUERY_SERVICE_URL")
 
 st.set_page_config(page_title="ScholarSync - The Learning Companion", layout="wide")
 st.title("ScholarSync - The Learning Companion")
 
+# Load the chat and embedding models in the background (once per process)
+warm_models_async(chat_models=[MODEL_NAME], embedding_models=[EMBEDDING_MODEL])
+
 # ---------- Sidebar ----------
 with st.sidebar:
     st.header("Knowledge Base")
@@ -26,16 +38,15 @@ with st.sidebar:
     OTHERS_DIR = os.path.join(KB_DIR, "Others")
     if not os.path.exists(OTHERS_DIR):
         os.makedirs(OTHERS_DIR)
+    # Single cached index shared by Folder Actions, Explorer and the folder selector
+    kb_index = get_kb_index(KB_DIR)
+    kb_folders = list_folders(kb_index)
 
     # Folder actions (create / delete)
     with st.expander("Folder Actions"):
         action = st.radio("Action", ["Create Subfolder", "Delete Folder"])
         # Gather existing folders
-        all_folders = ["/"]
-        for root, dirs, _ in os.walk(KB_DIR):
-            for d in dirs:
-                rel_path = os.path.relpath(os.path.join(root, d), KB_DIR)
-                all_folders.append(rel_path)
+        all_folders = ["/"] + [rel_path for rel_path, _ in kb_folders]
         if action == "Create Subfolder":
             parent_folder = st.selectbox("Select Parent Folder", all_folders, key="create_parent")
             new_folder_name = st.text_input("New Folder Name")
@@ -45,6 +56,7 @@ with st.sidebar:
                     folder_path = os.path.join(target_base, new_folder_name)
                     if not os.path.exists(folder_path):
                         os.makedirs(folder_path)
+                        invalidate_kb_index(KB_DIR)
                         st.success(f"Created: {new_folder_name}")
                         st.rerun()
                     else:
@@ -57,55 +69,56 @@ with st.sidebar:
                     try:
                         import shutil
                         shutil.rmtree(folder_path)
+                        invalidate_kb_index(KB_DIR)
                         st.success(f"Deleted: {folder_to_delete}")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error deleting folder: {e}")
 
     st.subheader("Explorer")
-    def display_tree(startpath):
-        try:
-            items = sorted(os.listdir(startpath))
-            dirs = [d for d in items if os.path.isdir(os.path.join(startpath, d))]
-            files = [f for f in items if os.path.isfile(os.path.join(startpath, f))]
-            for d in dirs:
-                dir_path = os.path.join(startpath, d)
-                with st.expander(f"📁 {d}", expanded=False):
-                    display_tree(dir_path)
-            for f in files:
-                ext = os.path.splitext(f)[1].lower()
-                icon = (
-                    "🖼️" if ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]
-                    else "📕" if ext == ".pdf"
-                    else "📊" if ext in [".xlsx", ".csv"]
-                    else "📝" if ext == ".docx"
-                    else "📊" if ext in [".pptx", ".ppt"]
-                    else "📄"
-                )
-                st.markdown(f"{icon} {f}")
-            if not dirs and not files:
-                st.caption("Empty folder")
-        except Exception as e:
-            st.error(f"Error reading directory: {e}")
-    display_tree(KB_DIR)
+    FILES_PAGE_SIZE = 50
+    def display_tree(rel_path, level=0):
+        # Only open folders are rendered; each folder's open flag lives in session state
+        node = kb_index.get(rel_path, {"dirs": [], "files": []})
+        dirs, files = node["dirs"], node["files"]
+        prefix = "— " * level
+        for d in dirs:
+            dir_rel = os.path.join(rel_path, d) if rel_path else d
+            open_key = f"explorer_open::{dir_rel}"
+            is_open = st.session_state.get(open_key, False)
+            if st.button(f"{prefix}{'📂' if is_open else '📁'} {d}", key=f"explorer_toggle::{dir_rel}"):
+                st.session_state[open_key] = not is_open
+                st.rerun()
+            if is_open:
+                display_tree(dir_rel, level + 1)
+        # Render large folders a page at a time
+        shown_key = f"explorer_shown::{rel_path}"
+        shown = st.session_state.get(shown_key, FILES_PAGE_SIZE)
+        for f in files[:shown]:
+            ext = os.path.splitext(f)[1].lower()
+            icon = (
+                "🖼️" if ext in [".jpg", ".jpeg", ".png", ".gif", ".webp"]
+                else "📕" if ext == ".pdf"
+                else "📊" if ext in [".xlsx", ".csv"]
+                else "📝" if ext == ".docx"
+                else "📊" if ext in [".pptx", ".ppt"]
+                else "📄"
+            )
+            st.markdown(f"{prefix}{icon} {f}")
+        if len(files) > shown:
+            if st.button(f"{prefix}Show more ({len(files) - shown} remaining)", key=f"explorer_more::{rel_path}"):
+                st.session_state[shown_key] = shown + FILES_PAGE_SIZE
+                st.rerun()
+        if not dirs and not files:
+            st.caption(f"{prefix}Empty folder")
+    display_tree("")
     st.divider()
 
     # ---------- Folder selector ----------
-    folder_options = []
-    def add_folders_recursive(parent_path, level=0):
-        try:
-            items = sorted(os.listdir(parent_path))
-            dirs = [d for d in items if os.path.isdir(os.path.join(parent_path, d))]
-            for d in dirs:
-                full_path = os.path.join(parent_path, d)
-                rel_path = os.path.relpath(full_path, KB_DIR)
-                prefix = "— " * level
-                label = f"{prefix}📁 {d}"
-                folder_options.append((label, rel_path))
-                add_folders_recursive(full_path, level + 1)
-        except Exception:
-            pass
-    add_folders_recursive(KB_DIR)
+    folder_options = [
+        (f"{'— ' * level}📁 {os.path.basename(rel_path)}", rel_path)
+        for rel_path, level in kb_folders
+    ]
     if not folder_options:
         folder_options = [("📁 Others", "Others")]
     default_index = 0
@@ -124,6 +137,13 @@ with st.sidebar:
 
     # ---------- Reset Everything button ----------
     st.header("⚙️ System Settings")
+    with st.expander("Model Queue"):
+        queue_stats = get_queue_stats()
+        if queue_stats:
+            for name, stats in queue_stats.items():
+                st.caption(f"{name}: {stats['requests']} requests, avg wait {stats['avg_wait']:.2f}s, max wait {stats['max_wait']:.2f}s")
+        else:
+            st.caption("No model requests yet")
     st.warning(
         """
         ### ⚠️ Danger Zone
@@ -138,10 +158,17 @@ with st.sidebar:
     if st.button("🗑️ Reset Everything (Delete All Files & Database)", type="secondary", disabled=not confirm_reset):
         try:
             import shutil
-            # Delete vector store
-            if os.path.exists("chroma_db"):
-                shutil.rmtree("chroma_db")
-                st.success("✅ Vector database deleted")
+            # Reset vector store through the index writer; other sessions' queries finish on the old index
+            if QUERY_SERVICE_URL:
+                from service_client import reset_remote
+                reset_remote(QUERY_SERVICE_URL)
+            else:
+                clear_database()
+            st.success("✅ Vector database deleted")
+            # Delete cached image thumbnails
+            from image_processing import THUMBNAIL_DIRECTORY
+            if os.path.exists(THUMBNAIL_DIRECTORY):
+                shutil.rmtree(THUMBNAIL_DIRECTORY)
             # Delete knowledge base
             if os.path.exists(KB_DIR):
                 shutil.rmtree(KB_DIR)
@@ -149,6 +176,7 @@ with st.sidebar:
             # Recreate empty structure
             os.makedirs(KB_DIR, exist_ok=True)
             os.makedirs(OTHERS_DIR, exist_ok=True)
+            invalidate_kb_index(KB_DIR)
             st.success("✅ Fresh folders created")
             st.info("🔄 Please refresh the page to see the changes.")
         except Exception as e:
@@ -176,6 +204,37 @@ def save_uploaded_file(uploaded_file, target_folder=None):
         st.error(f"Error saving file {uploaded_file.name}: {e}")
         return None
 
+def ingest_through_service(file_paths, ignored=(), failed=()):
+    """Have the query service index files already saved under KB_DIR and report the outcome"""
+    from service_client import ingest_remote
+    ignored, failed = list(ignored), list(failed)
+    result = {"status": "error", "message": "No valid documents loaded."}
+    if file_paths:
+        try:
+            with st.spinner("Indexing through the query service..."):
+                result = ingest_remote(QUERY_SERVICE_URL, file_paths)
+        except Exception as e:
+            result = {"status": "error", "message": f"Query service error: {e}"}
+        ignored += result.get("ignored", [])
+        failed += result.get("failed", [])
+    invalidate_kb_index(KB_DIR)
+    if result["status"] == "success":
+        success_msg = f"Successfully processed {len(file_paths) - len(result['failed']) - len(result['ignored'])} files ({result['chunks']} chunks)."
+        if ignored:
+            success_msg += f" Ignored: {', '.join(ignored)}."
+        if result.get("folded_into_index"):
+            success_msg += f" {result['folded_into_index']} chunks were already in the knowledge base and were linked to the existing copies."
+        st.success(success_msg)
+    else:
+        st.error(result["message"])
+        if ignored:
+            st.write(f"Ignored: {', '.join(ignored)}")
+    if failed:
+        st.error("Failed Files:")
+        for fail in failed:
+            st.write(f"- {fail}")
+    return result
+
 # ---------- Tab 1: Upload ----------
 with tab1:
     st.header("Upload to Knowledge Base")
@@ -203,43 +262,63 @@ with tab1:
             progress_bar = st.progress(0)
             status_text = st.empty()
             file_paths = []
-            # Save / extract files
+            results = []
+            zip_ignored, zip_failed = [], []
+            def update_progress(current, total, filename):
+                progress = int((current / total) * 100)
+                progress_bar.progress(progress)
+                status_text.text(f"Processing file {current+1}/{total}: {filename}")
+            # Save files; ZIPs are extracted and processed member by member
             with st.spinner("Saving and extracting files..."):
                 for uploaded_file in uploaded_files:
                     if uploaded_file.name.lower().endswith(".zip"):
                         try:
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmp_zip:
-                                tmp_zip.write(uploaded_file.getvalue())
-                                tmp_zip_path = tmp_zip.name
                             target_extract_path = os.path.join(KB_DIR, selected_folder)
-                            with zipfile.ZipFile(tmp_zip_path, "r") as zip_ref:
-                                zip_ref.extractall(target_extract_path)
-                            os.remove(tmp_zip_path)
-                            for root, _, files in os.walk(target_extract_path):
-                                for f in files:
-                                    file_paths.append(os.path.join(root, f))
+                            if QUERY_SERVICE_URL:
+                                # The service parses the members; here they are only extracted
+                                file_paths.extend(iter_zip_members(uploaded_file, target_extract_path, ignored=zip_ignored, failed=zip_failed))
+                                continue
+                            zip_result = load_and_split_zip(uploaded_file, target_extract_path, progress_callback=update_progress, deduplicate=False)
+                            file_paths.extend(zip_result["files"])
+                            results.append(zip_result)
                         except Exception as e:
                             st.error(f"Error extracting {uploaded_file.name}: {e}")
                     else:
                         path = save_uploaded_file(uploaded_file, selected_folder)
                         if path:
                             file_paths.append(path)
-            if file_paths:
+            if QUERY_SERVICE_URL:
+                progress_bar.progress(50)
+                status_text.text("Indexing through the query service...")
+                ingest_through_service(list(dict.fromkeys(file_paths)), zip_ignored, zip_failed)
+                progress_bar.progress(100)
+                status_text.text("Done!")
+            # A ZIP with no supported members still has a result to report
+            elif file_paths or results:
+                zip_files = {f for r in results for f in r["files"]}
                 file_paths = list(set(file_paths))
-                def update_progress(current, total, filename):
-                    progress = int((current / total) * 100)
-                    progress_bar.progress(progress)
-                    status_text.text(f"Processing file {current+1}/{total}: {filename}")
-                result = load_and_split_documents(file_paths, progress_callback=update_progress)
+                loose_files = [f for f in file_paths if f not in zip_files]
+                if loose_files:
+                    results.append(load_and_split_documents(loose_files, progress_callback=update_progress, deduplicate=False))
+                status_text.text("Removing near-duplicate chunks...")
+                result = merge_split_results(results)
                 if result["status"] == "success":
                     status_text.text("Indexing documents into vector store...")
                     with st.spinner("Indexing..."):
-                        index_documents(result["splits"])
+                        folded = index_documents(result["splits"])
+                    invalidate_kb_index(KB_DIR)
                     progress_bar.progress(100)
                     status_text.text("Done!")
-                    success_msg = f"Successfully processed {len(file_paths) - len(result['failed']) - len(result['ignored'])} files."
+                    # Ignored ZIP members were never written, so they are not in file_paths
+                    ignored_loose = len(result["ignored"]) - sum(len(r["ignored"]) for r in results if "files" in r)
+                    success_msg = f"Successfully processed {len(file_paths) - len(result['failed']) - ignored_loose} files."
                     if result["ignored"]:
                         success_msg += f" Ignored: {', '.join(result['ignored'])}."
+                    dedup = result["dedup"]
+                    if dedup["duplicates_removed"]:
+                        success_msg += f" Merged {dedup['duplicates_removed']} of {dedup['input_chunks']} chunks as near-duplicates ({dedup['dedup_ratio']:.0%}, {dedup['seconds']:.1f}s)."
+                    if folded:
+                        success_msg += f" {folded} chunks were already in the knowledge base and were linked to the existing copies."
                     st.success(success_msg)
                     if result["failed"]:
                         st.error("Failed Files:")
@@ -248,6 +327,10 @@ with tab1:
                     st.rerun()
                 else:
                     st.error(result["message"])
+                    if result["ignored"]:
+                        st.write(f"Ignored: {', '.join(result['ignored'])}")
+                    for fail in result["failed"]:
+                        st.write(f"- {fail}")
         else:
             st.warning("Please upload files first.")
 
@@ -263,17 +346,57 @@ with tab2:
     if quick_file:
         if st.button("Add to Context"):
             with st.spinner("Adding file..."):
-                path = save_uploaded_file(quick_file)
-                if path:
-                    result = ingest_files([path])
-                    st.success(result)
-                    os.remove(path)
+                if QUERY_SERVICE_URL:
+                    # The service only reads files inside the knowledge base, so the file is kept in Others
+                    path = save_uploaded_file(quick_file, "Others")
+                    if path:
+                        ingest_through_service([path])
+                else:
+                    path = save_uploaded_file(quick_file)
+                    if path:
+                        result = ingest_files([path])
+                        st.success(result)
+                        os.remove(path)
     st.divider()
+    def build_source_previews(source_docs):
+        """Keep only what the Source Documents panel shows: name, type, thumbnail and a short preview"""
+        from image_processing import create_thumbnail
+        sources = []
+        for doc in source_docs:
+            doc_type = doc.metadata.get('type', 'document')
+            source_file = doc.metadata.get('source', 'Unknown')
+            thumbnail = None
+            if doc_type == 'image':
+                thumbnail = doc.metadata.get('thumbnail')
+                if not (thumbnail and os.path.exists(thumbnail)) and os.path.exists(source_file):
+                    # Images indexed before thumbnails existed
+                    try:
+                        thumbnail = create_thumbnail(source_file)
+                    except ValueError:
+                        thumbnail = None
+            sources.append({
+                "name": os.path.basename(source_file),
+                "type": doc_type,
+                "thumbnail": thumbnail,
+                "preview": doc.page_content[:300],
+            })
+        return sources
+    def render_sources(sources):
+        with st.expander("📚 Source Documents"):
+            for i, source in enumerate(sources):
+                st.markdown(f"**Source {i+1}:** {source['name']}")
+                if source["thumbnail"] and os.path.exists(source["thumbnail"]):
+                    st.image(source["thumbnail"], caption=source["name"])
+                st.markdown(f"**Type:** {source['type']}")
+                st.markdown(f"**Content:** {source['preview']}...")
+                st.divider()
     if "messages" not in st.session_state:
         st.session_state.messages = []
     for message in st.session_state.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
+            if message.get("sources"):
+                render_sources(message["sources"])
     if prompt := st.chat_input("Ask a question about your documents..."):
         st.session_state.messages.append({"role": "user", "content": prompt})
         with st.chat_message("user"):
@@ -281,21 +404,14 @@ with tab2:
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
                 try:
-                    answer, source_docs = query_rag(prompt)
+                    if QUERY_SERVICE_URL:
+                        from service_client import query_remote
+                        answer, source_docs = query_remote(QUERY_SERVICE_URL, prompt)
+                    else:
+                        answer, source_docs = query_rag(prompt)
                     st.markdown(answer)
-                    with st.expander("📚 Source Documents"):
-                        for i, doc in enumerate(source_docs):
-                            doc_type = doc.metadata.get('type', 'document')
-                            source_file = doc.metadata.get('source', 'Unknown')
-                            st.markdown(f"**Source {i+1}:** {os.path.basename(source_file)}")
-                            if doc_type == 'image' and os.path.exists(source_file):
-                                try:
-                                    st.image(source_file, caption=os.path.basename(source_file), width=300)
-                                except:
-                                    pass
-                            st.markdown(f"**Type:** {doc_type}")
-                            st.markdown(f"**Content:** {doc.page_content[:300]}...")
-                            st.divider()
-                    st.session_state.messages.append({"role": "assistant", "content": answer})
+                    sources = build_source_previews(source_docs)
+                    render_sources(sources)
+                    st.session_state.messages.append({"role": "assistant", "content": answer, "sources": sources})
                 except Exception as e:
                     st.error(f"An error occurred: {e}")
@@ -0,0 +1,197 @@
+"""
+Batch question answering over the knowledge base.
+
+Reads questions from a JSONL or CSV file, embeds them in batches, retrieves
+context for every question in bulk and runs the LLM calls with bounded
+concurrency. Answers are streamed to a JSONL file as they complete, so an
+interrupted run can be resumed without redoing finished questions.
+
+Usage:
+    python batch_query.py questions.jsonl answers.jsonl --workers 4
+"""
+import os
+import csv
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rag_core import read_vectorstore, get_embeddings, get_llm, generate_answer, EMBEDDING_MODEL
+from ollama_clients import model_slot
+
+EMBED_BATCH_SIZE = 64
+RETRIEVAL_K = 4
+MAX_WORKERS = 4
+
+def load_questions(file_path):
+    """
+    Load questions from a JSONL or CSV file.
+    Each row needs a 'question' field; an optional 'id' field is kept,
+    otherwise (or when it is blank) the row number is used as the id.
+    Ids must be unique, since resuming is keyed on them.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    questions = []
+
+    if ext in ['.jsonl', '.json']:
+        with open(file_path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    elif ext == '.csv':
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        raise ValueError(f"Unsupported question file type: {ext}")
+
+    seen = set()
+    for i, row in enumerate(rows):
+        question = (row.get("question") or "").strip()
+        if not question:
+            continue
+        question_id = row.get("id")
+        question_id = str(question_id).strip() if question_id is not None else ""
+        if not question_id:
+            question_id = str(i)
+        if question_id in seen:
+            raise ValueError(f"Duplicate question id '{question_id}' in row {i + 1}; ids must be unique to resume.")
+        seen.add(question_id)
+        questions.append({"id": question_id, "question": question})
+
+    return questions
+
+def compact_output(output_path):
+    """
+    Prepare an existing output file for resuming.
+    Error records and partially written lines are dropped, since those
+    questions are retried and would otherwise appear twice. Returns the ids
+    already answered.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    kept = []
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            if record.get("status") == "success" and str(record["id"]) not in completed:
+                completed.add(str(record["id"]))
+                kept.append(line if line.endswith("\n") else line + "\n")
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.writelines(kept)
+    os.replace(tmp_path, output_path)
+    return completed
+
+def embed_questions(questions, batch_size=EMBED_BATCH_SIZE):
+    """Embed all question texts, batch_size at a time"""
+    embeddings = get_embeddings()
+    vectors = []
+    texts = [q["question"] for q in questions]
+    for start in range(0, len(texts), batch_size):
+        with model_slot(EMBEDDING_MODEL, background=True):
+            vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+    return vectors
+
+def retrieve_bulk(vectors, k=RETRIEVAL_K, batch_size=EMBED_BATCH_SIZE):
+    """Retrieve the top-k documents for many query vectors in one collection call per batch"""
+    from langchain_core.documents import Document
+    results = []
+    with read_vectorstore() as vectorstore:
+        for start in range(0, len(vectors), batch_size):
+            response = vectorstore._collection.query(
+                query_embeddings=vectors[start:start + batch_size],
+                n_results=k,
+                include=["documents", "metadatas"]
+            )
+            for texts, metadatas in zip(response["documents"], response["metadatas"]):
+                results.append([
+                    Document(page_content=text, metadata=metadata or {})
+                    for text, metadata in zip(texts, metadatas)
+                ])
+    return results
+
+def source_metadata(docs):
+    """Summarise source documents for the output record"""
+    return [
+        {
+            "source": doc.metadata.get("source", "Unknown"),
+            "type": doc.metadata.get("type", "document"),
+            "page": doc.metadata.get("page")
+        }
+        for doc in docs
+    ]
+
+def batch_query_rag(questions, output_path, max_workers=MAX_WORKERS, resume=True, progress_callback=None):
+    """
+    Answer a list of questions and stream the results to output_path as JSONL.
+    With resume=True, questions already answered in output_path are skipped
+    and earlier error records are replaced by the retry's result.
+    Returns a summary dict with counts of answered, skipped and failed questions.
+    """
+    completed = compact_output(output_path) if resume else set()
+    pending = [q for q in questions if q["id"] not in completed]
+
+    summary = {"total": len(questions), "skipped": len(questions) - len(pending), "answered": 0, "failed": 0}
+    if not pending:
+        return summary
+
+    vectors = embed_questions(pending)
+    all_source_docs = retrieve_bulk(vectors)
+    llm = get_llm()
+
+    mode = "a" if resume else "w"
+    with open(output_path, mode, encoding="utf-8") as out, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(generate_answer, q["question"], docs, llm, background=True): (q, docs)
+            for q, docs in zip(pending, all_source_docs)
+        }
+
+        for done, future in enumerate(as_completed(futures)):
+            q, docs = futures[future]
+            record = {"id": q["id"], "question": q["question"]}
+            try:
+                record["answer"] = future.result()
+                record["sources"] = source_metadata(docs)
+                record["status"] = "success"
+                summary["answered"] += 1
+            except Exception as e:
+                record["error"] = str(e)
+                record["status"] = "error"
+                summary["failed"] += 1
+
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+
+            if progress_callback:
+                progress_callback(done + 1, len(pending), q["id"])
+
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions against the knowledge base.")
+    parser.add_argument("input", help="Questions file (.jsonl or .csv) with a 'question' column")
+    parser.add_argument("output", help="Output JSONL file for answers")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Maximum concurrent LLM calls")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    args = parser.parse_args()
+
+    questions = load_questions(args.input)
+
+    def report(current, total, question_id):
+        print(f"[{current}/{total}] answered {question_id}")
+
+    summary = batch_query_rag(
+        questions,
+        args.output,
+        max_workers=args.workers,
+        resume=not args.no_resume,
+        progress_callback=report
+    )
+    print(f"Done: {summary['answered']} answered, {summary['skipped']} skipped, {summary['failed']} failed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Per-deck parse time: python-pptx slide extractor vs UnstructuredPowerPointLoader.
+
+Usage:
+    python bench_pptx.py deck1.pptx deck2.pptx ... [--runs 3]
+    python bench_pptx.py knowledge_base/ [--runs 3]
+
+Folders are searched recursively for .pptx files. The best of --runs timings
+is reported for each loader, along with the number of documents produced.
+"""
+import os
+import sys
+import time
+import argparse
+
+def find_decks(paths):
+    decks = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                decks.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(".pptx"))
+        elif path.lower().endswith(".pptx"):
+            decks.append(path)
+    return decks
+
+def time_loader(load, file_path, runs):
+    """Return (best_seconds, document_count) for load(file_path)"""
+    best = None
+    docs = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        docs = load(file_path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, len(docs)
+
+def load_with_pptx(file_path):
+    from ppt_processing import create_documents_from_pptx
+    return create_documents_from_pptx(file_path)
+
+def load_with_unstructured(file_path):
+    from langchain_community.document_loaders import UnstructuredPowerPointLoader
+    return UnstructuredPowerPointLoader(file_path).load()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PPTX parsing.")
+    parser.add_argument("paths", nargs="+", help="Decks or folders containing decks")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per deck and loader")
+    args = parser.parse_args()
+
+    decks = find_decks(args.paths)
+    if not decks:
+        print("No .pptx files found.")
+        sys.exit(1)
+
+    loaders = [("python-pptx", load_with_pptx), ("unstructured", load_with_unstructured)]
+    totals = {name: 0.0 for name, _ in loaders}
+
+    print(f"{'deck':<40}" + "".join(f"{name:>22}" for name, _ in loaders))
+    for deck in decks:
+        cells = []
+        for name, load in loaders:
+            try:
+                seconds, count = time_loader(load, deck, args.runs)
+                totals[name] += seconds
+                cells.append(f"{seconds * 1000:.1f} ms ({count} docs)")
+            except Exception as e:
+                cells.append(f"failed: {type(e).__name__}"[:21])
+        print(f"{os.path.basename(deck)[:39]:<40}" + "".join(f"{c:>22}" for c in cells))
+
+    print(f"{'total':<40}" + "".join(f"{totals[name] * 1000:>19.1f} ms" for name, _ in loaders))
+    if totals["python-pptx"] > 0 and totals["unstructured"] > 0:
+        print(f"Speedup: {totals['unstructured'] / totals['python-pptx']:.1f}x")
+
+if __name__ == "__main__":
+    main()
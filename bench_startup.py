@@ -0,0 +1,90 @@
+"""
+Import-time benchmark for the modules the app loads before its first render.
+
+Each module is imported in a fresh interpreter several times and the median
+wall time is compared against its budget. The script also checks that none
+of the heavy dependencies (loaders, model clients, the vector store) are
+pulled in at import time.
+
+Usage:
+    python bench_startup.py [--runs 5]
+
+Exits with status 1 if any budget is exceeded or a heavy module is imported.
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# Median import time budget per module, in milliseconds
+IMPORT_BUDGETS_MS = {
+    "rag_core": 50,
+    "kb_index": 50,
+    "zip_ingest": 50,
+    "batch_query": 50,
+    "ollama_clients": 50,
+    "index_snapshot": 50,
+    "dedup": 50,
+    "service_client": 50,
+    "index_writer": 50,
+}
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = [
+    "langchain_community",
+    "langchain_ollama",
+    "langchain_chroma",
+    "langchain_text_splitters",
+    "chromadb",
+    "unstructured",
+    "pandas",
+    "PIL",
+    "httpx",
+    "numpy",
+    "tiktoken",
+]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"ms": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+def measure_import(module, runs=5):
+    """Import module in fresh interpreters and return (median_ms, loaded_modules)"""
+    timings = []
+    loaded = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module)],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        loaded = result["modules"]
+    return statistics.median(timings), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time of the app's startup modules.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreter runs per module")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'module':<15}{'median ms':>12}{'budget ms':>12}  status")
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        median_ms, loaded = measure_import(module, args.runs)
+        heavy = [m for m in HEAVY_MODULES if m in loaded]
+        ok = median_ms <= budget and not heavy
+        failed = failed or not ok
+        status = "ok" if ok else "OVER BUDGET" if not heavy else f"imports {', '.join(heavy)}"
+        print(f"{module:<15}{median_ms:>12.1f}{budget:>12}  {status}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Near-duplicate chunk detection with MinHash and LSH banding.
+
+Each chunk is reduced to a set of word shingles and sketched with a MinHash
+signature. Signatures are split into bands; chunks that share a band bucket
+are candidates, and a candidate is a duplicate when the estimated Jaccard
+similarity reaches SIMILARITY_THRESHOLD. The first chunk seen is kept as the
+canonical one and records the sources of every duplicate folded into it.
+
+deduplicate_chunks folds duplicates within one upload. IndexDeduplicator
+does the same against everything already in an index generation (the same
+deck uploaded into several course folders, for example): the signatures of
+the generation's canonical chunks are kept in a sidecar file next to it, and
+a new chunk that matches one of them only adds its source to the stored
+chunk instead of being indexed again.
+"""
+import os
+import re
+import time
+import uuid
+import hashlib
+
+SHINGLE_SIZE = 5 # Words per shingle
+NUM_PERM = 128 # MinHash signature length
+BANDS = 32 # LSH bands (NUM_PERM / BANDS rows per band)
+SIMILARITY_THRESHOLD = 0.9
+SIDECAR_FILE = "dedup_signatures.npz"
+REBUILD_BATCH_SIZE = 1000
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_permutations = None
+
+def _get_permutations():
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+        rng = np.random.RandomState(1)
+        _permutations = (
+            rng.randint(1, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64),
+            rng.randint(0, _MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+        )
+    return _permutations
+
+def shingle(text, size=SHINGLE_SIZE):
+    """Return the set of lowercase word shingles of text"""
+    tokens = re.findall(r"\w+", text.lower())
+    if not tokens:
+        return set()
+    if len(tokens) <= size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+def minhash_signature(shingles):
+    """Compute the MinHash signature of a set of shingles"""
+    import numpy as np
+    a, b = _get_permutations()
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+    # Universal hashing for every permutation at once: (a * h + b) mod p, truncated to 32 bits
+    permuted = np.bitwise_and((np.outer(hashes, a) + b) % _MERSENNE_PRIME, _MAX_HASH)
+    return permuted.min(axis=0)
+
+def source_reference(doc):
+    """Describe where a chunk came from, e.g. 'notes.pdf#page=3'"""
+    return _metadata_reference(doc.metadata)
+
+def _metadata_reference(metadata):
+    source = metadata.get("source", "Unknown")
+    for key in ("page", "slide_number", "chunk_index"):
+        if metadata.get(key) is not None:
+            return f"{source}#{key}={metadata[key]}"
+    return source
+
+def _duplicate_refs(metadata):
+    return [r for r in (metadata.get("duplicate_sources") or "").split("; ") if r]
+
+def add_duplicate_sources(metadata, refs):
+    """Merge refs into a canonical chunk's duplicate metadata, skipping its own source"""
+    own = _metadata_reference(metadata)
+    unique_refs = [r for r in dict.fromkeys(_duplicate_refs(metadata) + list(refs)) if r != own]
+    # Count and sources come from the same list: distinct places other than the chunk's own
+    if unique_refs:
+        metadata["duplicate_count"] = len(unique_refs)
+        metadata["duplicate_sources"] = "; ".join(unique_refs)
+
+class BandIndex:
+    """MinHash signatures bucketed by LSH band, each stored under a key"""
+
+    def __init__(self):
+        self.keys = []
+        self.signatures = []
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def band_keys(signature):
+        rows = NUM_PERM // BANDS
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+    def add(self, key, signature):
+        idx = len(self.keys)
+        self.keys.append(key)
+        self.signatures.append(signature)
+        for band_key in self.band_keys(signature):
+            self.buckets.setdefault(band_key, []).append(idx)
+
+    def match(self, signature, threshold=SIMILARITY_THRESHOLD):
+        """Key of the first stored signature sharing a band and reaching threshold, or None"""
+        checked = set()
+        for band_key in self.band_keys(signature):
+            for idx in self.buckets.get(band_key, ()):
+                if idx in checked:
+                    continue
+                checked.add(idx)
+                if (self.signatures[idx] == signature).mean() >= threshold:
+                    return self.keys[idx]
+        return None
+
+def deduplicate_chunks(chunks, threshold=SIMILARITY_THRESHOLD):
+    """
+    Fold near-duplicate chunks into one canonical chunk.
+    Canonical chunks get 'duplicate_count' and 'duplicate_sources' metadata
+    listing the other places the same text was found.
+    Returns (unique_chunks, stats).
+    """
+    start = time.perf_counter()
+    bands = BandIndex()
+    canonical = []
+    duplicate_refs = []
+
+    for chunk in chunks:
+        shingles = shingle(chunk.page_content)
+        signature = minhash_signature(shingles) if shingles else None
+        match = bands.match(signature, threshold) if signature is not None else None
+
+        if match is not None:
+            duplicate_refs[match].append(source_reference(chunk))
+            duplicate_refs[match].extend(_duplicate_refs(chunk.metadata))
+            continue
+
+        if signature is not None:
+            bands.add(len(canonical), signature)
+        canonical.append(chunk)
+        duplicate_refs.append([])
+
+    for chunk, refs in zip(canonical, duplicate_refs):
+        add_duplicate_sources(chunk.metadata, refs)
+
+    stats = {
+        "input_chunks": len(chunks),
+        "unique_chunks": len(canonical),
+        "duplicates_removed": len(chunks) - len(canonical),
+        "dedup_ratio": (len(chunks) - len(canonical)) / len(chunks) if chunks else 0.0,
+        "seconds": time.perf_counter() - start
+    }
+    return canonical, stats
+
+class IndexDeduplicator:
+    """
+    Folds new chunks into near-duplicates already stored in one index generation.
+    Used by the index writer, so only one batch at a time touches a generation.
+    The sidecar records the collection size it describes; if the collection
+    was changed some other way (a snapshot upsert, another process) the
+    signatures are rebuilt from the stored chunks.
+    """
+
+    def __init__(self, index_dir, threshold=SIMILARITY_THRESHOLD):
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, SIDECAR_FILE)
+        self.threshold = threshold
+        self.bands = None
+        self.count = None
+        self.pending = {}
+
+    def _load(self, collection):
+        import numpy as np
+        count = collection.count()
+        if self.bands is not None and self.count == count:
+            return
+        self.bands = BandIndex()
+        if os.path.exists(self.path):
+            with np.load(self.path) as data:
+                if int(data["count"]) == count:
+                    for chunk_id, signature in zip(data["ids"].tolist(), data["signatures"].astype(np.uint64)):
+                        self.bands.add(chunk_id, signature)
+                    self.count = count
+                    return
+
+        for offset in range(0, count, REBUILD_BATCH_SIZE):
+            batch = collection.get(limit=REBUILD_BATCH_SIZE, offset=offset, include=["documents"])
+            for chunk_id, text in zip(batch["ids"], batch["documents"]):
+                shingles = shingle(text or "")
+                if shingles:
+                    self.bands.add(chunk_id, minhash_signature(shingles))
+        self.count = count
+
+    def fold(self, vectorstore, chunks):
+        """
+        Match chunks against the stored canonical chunks and each other.
+        Returns (new_chunks, new_ids, is_new), where is_new flags each input
+        chunk. Sources of folded chunks are written by commit().
+        """
+        self._load(vectorstore._collection)
+        new_chunks, new_ids, is_new = [], [], []
+        batch = {}
+        for chunk in chunks:
+            shingles = shingle(chunk.page_content)
+            signature = minhash_signature(shingles) if shingles else None
+            match = self.bands.match(signature, self.threshold) if signature is not None else None
+            if match is not None:
+                refs = [source_reference(chunk)] + _duplicate_refs(chunk.metadata)
+                if match in batch:
+                    add_duplicate_sources(batch[match].metadata, refs)
+                else:
+                    self.pending.setdefault(match, []).extend(refs)
+                is_new.append(False)
+                continue
+
+            chunk_id = str(uuid.uuid4())
+            if signature is not None:
+                self.bands.add(chunk_id, signature)
+            batch[chunk_id] = chunk
+            new_chunks.append(chunk)
+            new_ids.append(chunk_id)
+            is_new.append(True)
+        return new_chunks, new_ids, is_new
+
+    def commit(self, vectorstore):
+        """Add folded sources to the stored chunks and save the sidecar; call once the new chunks are indexed"""
+        import numpy as np
+        collection = vectorstore._collection
+        if self.pending:
+            stored = collection.get(ids=list(self.pending), include=["metadatas"])
+            metadatas = []
+            for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                metadata = dict(metadata or {})
+                add_duplicate_sources(metadata, self.pending[chunk_id])
+                metadatas.append(metadata)
+            if metadatas:
+                collection.update(ids=stored["ids"], metadatas=metadatas)
+            self.pending = {}
+
+        self.count = collection.count()
+        signatures = np.array(self.bands.signatures, dtype=np.uint32).reshape(len(self.bands), NUM_PERM)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ids=np.array(self.bands.keys, dtype=str), signatures=signatures, count=self.count)
+        os.replace(tmp_path, self.path)
+
+    def reset(self):
+        """Forget in-memory state after a failed write; the next batch reloads from disk"""
+        self.bands = None
+        self.count = None
+        self.pending = {}
@@ -1,9 +1,13 @@
 import os
 import base64
+import hashlib
 from PIL import Image
 from io import BytesIO
 from langchain_core.documents import Document
 
+THUMBNAIL_DIRECTORY = "./thumbnails"
+THUMBNAIL_SIZE = (300, 300)
+
 def load_image(file_path):
     """Load and validate an image file"""
     try:
@@ -23,6 +27,35 @@ def image_to_base64(file_path):
     except Exception as e:
         raise ValueError(f"Error encoding image {file_path}: {str(e)}")
 
+def get_thumbnail_path(file_path):
+    """Cache path of an image's thumbnail, keyed by its path, size and modification time"""
+    stat = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return os.path.join(THUMBNAIL_DIRECTORY, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+def create_thumbnail(file_path, size=THUMBNAIL_SIZE):
+    """Create a small JPEG preview of an image once and return its path"""
+    thumbnail_path = get_thumbnail_path(file_path)
+    if os.path.exists(thumbnail_path):
+        return thumbnail_path
+    
+    try:
+        os.makedirs(THUMBNAIL_DIRECTORY, exist_ok=True)
+        img = Image.open(file_path)
+        # Let the JPEG decoder downscale while reading
+        img.draft('RGB', size)
+        img.thumbnail(size)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        # Write to a temp name first so readers never see a partial file
+        tmp_path = thumbnail_path + ".tmp"
+        img.save(tmp_path, "JPEG", quality=85)
+        os.replace(tmp_path, thumbnail_path)
+        return thumbnail_path
+    except Exception as e:
+        raise ValueError(f"Error creating thumbnail for {file_path}: {str(e)}")
+
 def generate_image_description(image_path, llm):
     """Use multimodal LLM to generate a description of the image"""
     try:
@@ -58,6 +91,12 @@ def create_image_document(file_path, description=None):
         "extension": os.path.splitext(filename)[1].lower()
     }
     
+    # Thumbnail for the chat panel, so previews never load the original
+    try:
+        metadata["thumbnail"] = create_thumbnail(file_path)
+    except ValueError as e:
+        print(f"Warning: {e}")
+    
     # If we have a description, use it as the page_content
     # Otherwise, just use the filename and path
     if description:
@@ -0,0 +1,186 @@
+"""
+Portable snapshots of the vector index.
+
+A snapshot is a folder with:
+    embeddings.npy  - float32 array (chunks x dimensions), memory-mappable
+    chunks.jsonl    - one line per chunk with its id, text and metadata,
+                      in the same order as the embedding rows
+    manifest.json   - collection name, embedding model, counts and the
+                      SHA-256 checksum of both data files
+
+Restoring a snapshot upserts the stored vectors straight into Chroma, so
+nothing is re-embedded. Checksums are verified before anything is written.
+
+Usage:
+    python index_snapshot.py export snapshots/2025-12-01
+    python index_snapshot.py import snapshots/2025-12-01 [--keep-existing]
+"""
+import os
+import json
+import hashlib
+import argparse
+
+from rag_core import read_vectorstore, get_index_coordinator, COLLECTION_NAME, EMBEDDING_MODEL
+
+SNAPSHOT_VERSION = 1
+EMBEDDINGS_FILE = "embeddings.npy"
+CHUNKS_FILE = "chunks.jsonl"
+MANIFEST_FILE = "manifest.json"
+BATCH_SIZE = 1000
+
+def _file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def export_snapshot(snapshot_dir):
+    """Write the current collection to snapshot_dir and return its manifest"""
+    import numpy as np
+    from numpy.lib.format import open_memmap
+
+    with read_vectorstore() as vectorstore:
+        collection = vectorstore._collection
+        total = collection.count()
+        if total == 0:
+            raise ValueError("The index is empty, nothing to export.")
+
+        os.makedirs(snapshot_dir, exist_ok=True)
+        embeddings_path = os.path.join(snapshot_dir, EMBEDDINGS_FILE)
+        chunks_path = os.path.join(snapshot_dir, CHUNKS_FILE)
+
+        matrix = None
+        written = 0
+        with open(chunks_path, "w", encoding="utf-8") as chunks_out:
+            for offset in range(0, total, BATCH_SIZE):
+                batch = collection.get(
+                    limit=BATCH_SIZE,
+                    offset=offset,
+                    include=["embeddings", "documents", "metadatas"]
+                )
+                vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+                if len(vectors) == 0:
+                    break
+                if matrix is None:
+                    matrix = open_memmap(embeddings_path, mode="w+", dtype=np.float32, shape=(total, vectors.shape[1]))
+
+                matrix[written:written + len(vectors)] = vectors
+                for chunk_id, text, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                    chunks_out.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata or {}}, ensure_ascii=False) + "\n")
+                written += len(vectors)
+
+    if written != total:
+        raise ValueError(f"Collection changed during export ({written} of {total} chunks read).")
+    matrix.flush()
+    dimensions = matrix.shape[1]
+    del matrix
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "collection": COLLECTION_NAME,
+        "embedding_model": EMBEDDING_MODEL,
+        "count": written,
+        "dimensions": dimensions,
+        "checksums": {
+            EMBEDDINGS_FILE: _file_sha256(embeddings_path),
+            CHUNKS_FILE: _file_sha256(chunks_path)
+        }
+    }
+    with open(os.path.join(snapshot_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def verify_snapshot(snapshot_dir):
+    """Check a snapshot's files against its manifest and return the manifest"""
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No snapshot manifest found in {snapshot_dir}")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version: {manifest.get('version')}")
+    for filename, expected in manifest["checksums"].items():
+        path = os.path.join(snapshot_dir, filename)
+        if not os.path.exists(path):
+            raise ValueError(f"Snapshot file missing: {filename}")
+        if _file_sha256(path) != expected:
+            raise ValueError(f"Checksum mismatch for {filename}")
+    return manifest
+
+def load_snapshot(snapshot_dir, verify=True):
+    """
+    Open a snapshot without touching Chroma.
+    Returns (manifest, embeddings, chunks) where embeddings is a read-only
+    memory-mapped array and chunks is the list of chunk records.
+    """
+    import numpy as np
+
+    if verify:
+        manifest = verify_snapshot(snapshot_dir)
+    else:
+        with open(os.path.join(snapshot_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    embeddings = np.load(os.path.join(snapshot_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    with open(os.path.join(snapshot_dir, CHUNKS_FILE), "r", encoding="utf-8") as f:
+        chunks = [json.loads(line) for line in f if line.strip()]
+
+    if len(chunks) != manifest["count"] or embeddings.shape != (manifest["count"], manifest["dimensions"]):
+        raise ValueError("Snapshot files do not match the manifest counts.")
+    return manifest, embeddings, chunks
+
+def import_snapshot(snapshot_dir, replace=True, verify=True):
+    """
+    Restore a snapshot into the vector store without re-embedding.
+    With replace=True the snapshot replaces the existing index in a single
+    switch; otherwise its chunks are upserted alongside it.
+    Returns the number of chunks restored.
+    """
+    manifest, embeddings, chunks = load_snapshot(snapshot_dir, verify=verify)
+    if manifest["embedding_model"] != EMBEDDING_MODEL:
+        raise ValueError(
+            f"Snapshot was built with {manifest['embedding_model']}, "
+            f"but this node uses {EMBEDDING_MODEL}."
+        )
+
+    def restore(vectorstore):
+        collection = vectorstore._collection
+        for start in range(0, len(chunks), BATCH_SIZE):
+            batch = chunks[start:start + BATCH_SIZE]
+            collection.upsert(
+                ids=[c["id"] for c in batch],
+                embeddings=embeddings[start:start + len(batch)].tolist(),
+                documents=[c["text"] for c in batch],
+                metadatas=[c["metadata"] or None for c in batch]
+            )
+        return len(chunks)
+
+    # A replacing restore fills a fresh generation and switches to it only once it is complete
+    coordinator = get_index_coordinator()
+    if replace:
+        return coordinator.replace(restore).result()
+    return coordinator.run(restore).result()
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or restore a portable snapshot of the vector index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write the current index to a snapshot folder")
+    export_parser.add_argument("snapshot_dir")
+
+    import_parser = subparsers.add_parser("import", help="Restore a snapshot folder into the index")
+    import_parser.add_argument("snapshot_dir")
+    import_parser.add_argument("--keep-existing", action="store_true", help="Upsert into the current index instead of replacing it")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        manifest = export_snapshot(args.snapshot_dir)
+        print(f"Exported {manifest['count']} chunks ({manifest['dimensions']} dimensions) to {args.snapshot_dir}")
+    else:
+        restored = import_snapshot(args.snapshot_dir, replace=not args.keep_existing)
+        print(f"Restored {restored} chunks from {args.snapshot_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""
+Single-writer coordinator for the vector index.
+
+All index mutations (adding chunks, clearing, restoring) are queued and run
+one at a time on a dedicated writer thread, so concurrent sessions never
+write to Chroma at the same moment. Adds that are waiting in the queue
+together are merged into one larger upsert. With a deduplicator, each batch
+is first folded into near-duplicates already in the index (see dedup.py).
+
+The index lives in generation folders under the persist directory, with a
+CURRENT file naming the active one. Readers take a lease on the current
+generation for the duration of a query. A reset or restore fills a fresh
+generation and only then switches CURRENT atomically. CURRENT is re-read
+whenever it changes on disk, so several processes can share one index.
+
+Each process records its readers in a lease file under leases/ as well, so
+a switch in one process never deletes a generation that a reader in another
+process (a batch_query run, a snapshot export) still holds. The generation
+that was just replaced is also kept until the next switch. Older ones with
+no lease are deleted then, and any that cannot be deleted yet (open sqlite
+files on Windows) are retried at the switch after. A lease older than
+LEASE_MAX_AGE_SECONDS is treated as left behind by a crashed process.
+
+The first generation is created under a lock file, so processes starting
+together on an empty or pre-generation persist directory agree on it.
+"""
+import os
+import time
+import queue
+import shutil
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from ollama_clients import model_slot
+
+POINTER_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+BUILDING_MARKER = ".building" # Present in a generation until it has been filled and switched to
+LEASE_DIR = "leases"
+LEASE_MAX_AGE_SECONDS = 24 * 3600
+INIT_LOCK_FILE = "INIT.lock"
+INIT_LOCK_STALE_SECONDS = 60 # A lock this old was left by a process that died while starting
+MAX_BATCH_CHUNKS = 2000 # Upper bound on chunks merged into one upsert
+
+_coordinators = {}
+_coordinators_lock = threading.Lock()
+
+class IndexCoordinator:
+    def __init__(self, root, open_store, embedding_model, make_deduplicator=None):
+        self.root = root
+        self.open_store = open_store
+        self.embedding_model = embedding_model
+        self.make_deduplicator = make_deduplicator
+        self.deduplicator = None
+        self.ops = queue.Queue()
+        self.lock = threading.Lock()
+        self.readers = {}
+        self.carry = None
+        self.pointer_stamp = None
+        self.generation = self._load_generation()
+        self.thread = threading.Thread(target=self._worker, name="index-writer", daemon=True)
+        self.thread.start()
+
+    # ---------- Generations ----------
+    def _new_generation_name(self):
+        return f"{GENERATION_PREFIX}{time.time_ns()}"
+
+    def _pointer_path(self):
+        return os.path.join(self.root, POINTER_FILE)
+
+    def _write_pointer(self, generation):
+        tmp_path = os.path.join(self.root, f"{POINTER_FILE}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(tmp_path, self._pointer_path())
+
+    def _pointer_signature(self):
+        st = os.stat(self._pointer_path())
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def _read_pointer(self):
+        self.pointer_stamp = self._pointer_signature()
+        with open(self._pointer_path(), "r", encoding="utf-8") as f:
+            generation = f.read().strip()
+        os.makedirs(self.path(generation), exist_ok=True)
+        return generation
+
+    @contextmanager
+    def _init_lock(self):
+        """Cross-process lock held while the first generation is created"""
+        lock_path = os.path.join(self.root, INIT_LOCK_FILE)
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > INIT_LOCK_STALE_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except OSError:
+                    continue
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    def _is_internal(self, name):
+        return name.startswith((GENERATION_PREFIX, POINTER_FILE)) or name in (LEASE_DIR, INIT_LOCK_FILE)
+
+    def _load_generation(self):
+        os.makedirs(self.root, exist_ok=True)
+        if os.path.exists(self._pointer_path()):
+            return self._read_pointer()
+
+        with self._init_lock():
+            # Another process may have created it while this one waited for the lock
+            if os.path.exists(self._pointer_path()):
+                return self._read_pointer()
+
+            generation = self._new_generation_name()
+            generation_dir = self.path(generation)
+            os.makedirs(generation_dir)
+            # Move an index created before generations existed into the first generation
+            for name in os.listdir(self.root):
+                if not self._is_internal(name):
+                    shutil.move(os.path.join(self.root, name), os.path.join(generation_dir, name))
+            self._write_pointer(generation)
+            self.pointer_stamp = self._pointer_signature()
+            return generation
+
+    def _refresh_generation(self):
+        """Pick up a switch made by another process; call with self.lock held"""
+        try:
+            stamp = self._pointer_signature()
+        except OSError:
+            return
+        if stamp == self.pointer_stamp:
+            return
+        with open(self._pointer_path(), "r", encoding="utf-8") as f:
+            generation = f.read().strip()
+        if generation:
+            self.generation = generation
+        self.pointer_stamp = stamp
+
+    def path(self, generation):
+        return os.path.join(self.root, generation)
+
+    def current_directory(self):
+        with self.lock:
+            self._refresh_generation()
+            return self.path(self.generation)
+
+    # ---------- Leases ----------
+    def _lease_path(self, generation):
+        return os.path.join(self.root, LEASE_DIR, f"{generation}.{os.getpid()}")
+
+    def _leased_on_disk(self):
+        """Generations leased by any process, dropping leases left behind by crashed ones"""
+        leased = set()
+        lease_dir = os.path.join(self.root, LEASE_DIR)
+        if not os.path.isdir(lease_dir):
+            return leased
+        now = time.time()
+        for name in os.listdir(lease_dir):
+            path = os.path.join(lease_dir, name)
+            try:
+                if now - os.path.getmtime(path) > LEASE_MAX_AGE_SECONDS:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            leased.add(name.rsplit(".", 1)[0])
+        return leased
+
+    def _remove_old_generations(self, keep):
+        """Delete generations other than keep that no reader holds; failures are retried at the next switch"""
+        with self.lock:
+            leased = {g for g, count in self.readers.items() if count}
+        leased |= self._leased_on_disk()
+        for name in os.listdir(self.root):
+            path = self.path(name)
+            if not name.startswith(GENERATION_PREFIX) or name in keep or name in leased:
+                continue
+            # Another process may be filling this generation right now
+            if os.path.exists(os.path.join(path, BUILDING_MARKER)):
+                continue
+            try:
+                shutil.rmtree(path)
+            except OSError as e:
+                print(f"Warning: Could not remove old index generation {name}, will retry: {e}")
+
+    @contextmanager
+    def read_lease(self):
+        """Pin the current generation for the duration of the block and yield its directory"""
+        with self.lock:
+            self._refresh_generation()
+            generation = self.generation
+            self.readers[generation] = self.readers.get(generation, 0) + 1
+            if self.readers[generation] == 1:
+                # Visible to switches made by other processes
+                os.makedirs(os.path.join(self.root, LEASE_DIR), exist_ok=True)
+                open(self._lease_path(generation), "w").close()
+        try:
+            yield self.path(generation)
+        finally:
+            with self.lock:
+                self.readers[generation] -= 1
+                if self.readers[generation] == 0:
+                    del self.readers[generation]
+                    try:
+                        os.remove(self._lease_path(generation))
+                    except OSError:
+                        pass
+
+    # ---------- Write queue ----------
+    def _submit(self, kind, payload=None):
+        future = Future()
+        self.ops.put((kind, payload, future))
+        return future
+
+    def add_documents(self, docs):
+        """Queue chunks for indexing; the future resolves to the number of chunks added, not folded into existing ones"""
+        return self._submit("add", docs)
+
+    def clear(self):
+        """Queue a reset of the index; readers keep the old generation until they finish"""
+        return self._submit("replace")
+
+    def replace(self, fn):
+        """
+        Queue a rebuild: fn(vectorstore) fills a fresh generation, which then
+        becomes current in one switch. The future resolves to fn's result; if
+        fn fails the current index is left untouched.
+        """
+        return self._submit("replace", fn)
+
+    def run(self, fn):
+        """Queue fn(vectorstore) to run on the writer thread; the future resolves to its result"""
+        return self._submit("run", fn)
+
+    def _next_op(self):
+        if self.carry is not None:
+            op, self.carry = self.carry, None
+            return op
+        return self.ops.get()
+
+    def _worker(self):
+        while True:
+            kind, payload, future = self._next_op()
+            if kind == "add":
+                self._apply_adds(self._collect_adds(payload, future))
+            elif kind == "replace":
+                self._apply(future, lambda: self._replace(payload))
+            elif kind == "run":
+                self._apply(future, lambda: payload(self.open_store(self.current_directory())))
+
+    def _collect_adds(self, docs, future):
+        """Merge adds already waiting in the queue into one batch"""
+        batch = [(docs, future)]
+        total = len(docs)
+        while total < MAX_BATCH_CHUNKS:
+            try:
+                op = self.ops.get_nowait()
+            except queue.Empty:
+                break
+            if op[0] != "add":
+                self.carry = op
+                break
+            batch.append((op[1], op[2]))
+            total += len(op[1])
+        return batch
+
+    def _get_deduplicator(self, directory):
+        if self.make_deduplicator is None:
+            return None
+        if self.deduplicator is None or self.deduplicator.index_dir != directory:
+            self.deduplicator = self.make_deduplicator(directory)
+        return self.deduplicator
+
+    def _apply_adds(self, batch):
+        docs = [doc for payload, _ in batch for doc in payload]
+        is_new = [True] * len(docs)
+        deduplicator = None
+        try:
+            directory = self.current_directory()
+            vectorstore = self.open_store(directory)
+            deduplicator = self._get_deduplicator(directory)
+            if deduplicator is not None:
+                new_docs, ids, is_new = deduplicator.fold(vectorstore, docs)
+                if new_docs:
+                    with model_slot(self.embedding_model, background=True):
+                        vectorstore.add_documents(documents=new_docs, ids=ids)
+                deduplicator.commit(vectorstore)
+            else:
+                with model_slot(self.embedding_model, background=True):
+                    vectorstore.add_documents(documents=docs)
+        except Exception as e:
+            if deduplicator is not None:
+                deduplicator.reset()
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        start = 0
+        for payload, future in batch:
+            future.set_result(sum(is_new[start:start + len(payload)]))
+            start += len(payload)
+
+    def _apply(self, future, fn):
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+
+    def _replace(self, fill=None):
+        generation = self._new_generation_name()
+        generation_dir = self.path(generation)
+        marker = os.path.join(generation_dir, BUILDING_MARKER)
+        os.makedirs(generation_dir)
+        open(marker, "w").close()
+        try:
+            result = fill(self.open_store(generation_dir)) if fill is not None else "Database cleared."
+        except Exception:
+            # Without the marker, anything left behind is removed at a later switch
+            os.remove(marker)
+            shutil.rmtree(generation_dir, ignore_errors=True)
+            raise
+        os.remove(marker)
+
+        with self.lock:
+            self._refresh_generation()
+            old = self.generation
+            self._write_pointer(generation)
+            self.generation = generation
+            self.pointer_stamp = self._pointer_signature()
+        self._remove_old_generations(keep={generation, old})
+        return result
+
+def get_index_coordinator(root, open_store, embedding_model, make_deduplicator=None):
+    """Return the process-wide coordinator for the index at root"""
+    key = os.path.abspath(root)
+    with _coordinators_lock:
+        if key not in _coordinators:
+            _coordinators[key] = IndexCoordinator(root, open_store, embedding_model, make_deduplicator)
+        return _coordinators[key]
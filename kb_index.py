@@ -0,0 +1,93 @@
+"""
+Cached file-tree index of the knowledge base folder.
+
+The sidebar explorer and the folder pickers all read from one index that is
+built with a single os.scandir walk. The index is rebuilt only when a
+directory mtime changes (a file or folder was added, removed or renamed
+somewhere in the tree) or when invalidate_kb_index is called after the app
+itself changes the tree.
+"""
+import os
+import threading
+
+_cache = {}
+_lock = threading.Lock()
+
+def _scan_tree(kb_dir):
+    """
+    Walk kb_dir once and return (index, signature).
+    index maps each relative folder path ("" for the root) to its sorted
+    subfolder and file names. The signature is built from directory mtimes
+    only, so files are never stat'ed.
+    """
+    index = {}
+    signature = []
+    stack = [""]
+
+    while stack:
+        rel = stack.pop()
+        full = os.path.join(kb_dir, rel) if rel else kb_dir
+        dirs, files = [], []
+        try:
+            signature.append((rel, os.stat(full).st_mtime_ns))
+            with os.scandir(full) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+        except OSError:
+            pass
+        dirs.sort()
+        files.sort()
+        index[rel] = {"dirs": dirs, "files": files}
+        for d in reversed(dirs):
+            stack.append(os.path.join(rel, d) if rel else d)
+
+    return index, tuple(sorted(signature))
+
+def _tree_signature(kb_dir, index):
+    """Recompute the directory mtime signature for the folders in an existing index"""
+    signature = []
+    for rel in index:
+        full = os.path.join(kb_dir, rel) if rel else kb_dir
+        try:
+            signature.append((rel, os.stat(full).st_mtime_ns))
+        except OSError:
+            return None
+    return tuple(sorted(signature))
+
+def get_kb_index(kb_dir):
+    """Return the cached index for kb_dir, rebuilding it if the tree changed"""
+    key = os.path.abspath(kb_dir)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            index, signature = cached
+            if _tree_signature(kb_dir, index) == signature:
+                return index
+
+        index, signature = _scan_tree(kb_dir)
+        _cache[key] = (index, signature)
+        return index
+
+def invalidate_kb_index(kb_dir=None):
+    """Drop the cached index for kb_dir, or for every folder if kb_dir is None"""
+    with _lock:
+        if kb_dir is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(kb_dir), None)
+
+def list_folders(index):
+    """Return (relative_path, depth) for every subfolder, in depth-first sorted order"""
+    folders = []
+
+    def visit(rel, depth):
+        for d in index.get(rel, {}).get("dirs", []):
+            child = os.path.join(rel, d) if rel else d
+            folders.append((child, depth))
+            visit(child, depth + 1)
+
+    visit("", 0)
+    return folders
@@ -0,0 +1,354 @@
+"""
+Concurrent-user load test for the chat and upload flows.
+
+Simulates N chat sessions calling query_rag with a mix of questions, plus an
+optional background uploader running load_and_split_documents and
+index_documents, while concurrency ramps up stage by stage. Each stage
+reports throughput, latency percentiles, errors and process resource use;
+the saturation point is the first stage where p95 latency exceeds the
+target or added sessions stop adding throughput.
+
+By default it runs against the Ollama server in OLLAMA_BASE_URL. With
+--stand-in, a local stand-in backend is started that answers the Ollama
+chat, generate and embed endpoints after a fixed delay, so the app's own
+overhead (retrieval, chain, client pooling, index writes) can be measured
+without GPU time. The stand-in runs in this process, so its small CPU cost
+is included in the reported CPU use.
+
+The test indexes into a temporary persist directory that is deleted at the
+end, so it never touches the real ./chroma_db. --upload-dir is indexed once
+before the first stage, so every stage retrieves from a filled index; pass
+--persist-dir to run against a copy of an existing index instead (it is left
+in place). The test refuses to start on an empty index unless
+--allow-empty-index is given.
+
+Each stage reports the peak RSS sampled while it ran (needs psutil or
+/proc), and the run ends with the process's lifetime peak (needs the
+resource module or psutil). Values that cannot be read are shown as n/a.
+
+Usage:
+    python load_test.py --stand-in --stages 1,2,4,8,16 --stage-seconds 30
+    python load_test.py --questions questions.jsonl --upload-dir sample_docs/
+"""
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_QUESTIONS = [
+    "What is net present value and how is it calculated?",
+    "Summarise Porter's five forces.",
+    "What are the key assumptions of the CAPM model?",
+    "Explain the difference between marketing mix and marketing strategy.",
+    "What topics are covered in the operations management syllabus?",
+    "How is working capital defined?",
+    "What is a balanced scorecard?",
+    "List the deliverables for the group project.",
+]
+SATURATION_GAIN = 0.10 # Throughput gain below this counts as saturated
+RSS_SAMPLE_SECONDS = 0.25
+STAND_IN_DIMENSIONS = 768
+
+# ---------- Stand-in model backend ----------
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers the subset of the Ollama API used by the app after a fixed delay"""
+    chat_latency = 0.5
+    embed_latency = 0.02
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _embed(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        rng = random.Random(digest)
+        return [rng.uniform(-1, 1) for _ in range(STAND_IN_DIMENSIONS)]
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "stand-in")
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+        if self.path == "/api/embed":
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            time.sleep(self.embed_latency)
+            self._send_json({"model": model, "embeddings": [self._embed(t) for t in inputs]})
+        elif self.path in ("/api/chat", "/api/generate"):
+            time.sleep(self.chat_latency)
+            text = "This is a stand-in answer generated for load testing."
+            if self.path == "/api/generate":
+                self._send_json({"model": model, "created_at": created_at, "response": "", "done": True})
+                return
+            final = {"model": model, "created_at": created_at, "message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "stop"}
+            if request.get("stream", True):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for word in text.split(" "):
+                    chunk = {"model": model, "created_at": created_at, "message": {"role": "assistant", "content": word + " "}, "done": False}
+                    self.wfile.write((json.dumps(chunk) + "\n").encode("utf-8"))
+                self.wfile.write((json.dumps(final) + "\n").encode("utf-8"))
+            else:
+                final["message"]["content"] = text
+                self._send_json(final)
+        else:
+            self.send_error(404)
+
+def start_stand_in(chat_latency, embed_latency):
+    """Start the stand-in backend on a free local port and return its base URL"""
+    StandInHandler.chat_latency = chat_latency
+    StandInHandler.embed_latency = embed_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, name="stand-in-backend", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+# ---------- Load generation ----------
+def current_rss_mb():
+    """Current resident memory of this process in MB, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def sample_rss(stop, samples):
+    """Record current RSS every RSS_SAMPLE_SECONDS until stop is set"""
+    while True:
+        rss = current_rss_mb()
+        if rss is None:
+            return
+        samples.append(rss)
+        if stop.wait(RSS_SAMPLE_SECONDS):
+            return
+
+def process_peak_rss_mb():
+    """Lifetime peak resident memory of this process in MB, or None if it cannot be read"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def chat_session(questions, stop, latencies, errors, think_time, lock):
+    from rag_core import query_rag
+    while not stop.is_set():
+        question = random.choice(questions)
+        start = time.perf_counter()
+        try:
+            query_rag(question)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        if think_time:
+            stop.wait(random.uniform(0, 2 * think_time))
+
+def uploader(file_paths, stop, upload_times, interval, lock):
+    from rag_core import load_and_split_documents, index_documents
+    while not stop.is_set():
+        start = time.perf_counter()
+        result = load_and_split_documents(file_paths)
+        if result["status"] == "success":
+            index_documents(result["splits"])
+        with lock:
+            upload_times.append(time.perf_counter() - start)
+        stop.wait(interval)
+
+def run_stage(sessions, questions, seconds, think_time, upload_files, upload_interval):
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies, errors, upload_times, rss_samples = [], [], [], []
+
+    sampler = threading.Thread(target=sample_rss, args=(stop, rss_samples), daemon=True)
+    sampler.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    threads = [
+        threading.Thread(target=chat_session, args=(questions, stop, latencies, errors, think_time, lock), daemon=True)
+        for _ in range(sessions)
+    ]
+    if upload_files:
+        threads.append(threading.Thread(target=uploader, args=(upload_files, stop, upload_times, upload_interval, lock), daemon=True))
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    sampler.join()
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        "sessions": sessions,
+        "answers": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / wall,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "uploads": len(upload_times),
+        "upload_avg": sum(upload_times) / len(upload_times) if upload_times else 0.0,
+        "cpu_percent": 100 * cpu / wall,
+        "stage_peak_rss_mb": max(rss_samples) if rss_samples else None,
+        "sample_error": errors[0] if errors else ""
+    }
+
+def format_mb(value):
+    return "n/a" if value is None else f"{value:.0f}"
+
+def find_saturation(stages, p95_target):
+    """Return the first stage past which the node stops scaling, or None"""
+    previous = None
+    for stage in stages:
+        if stage["p95"] > p95_target:
+            return stage
+        if previous and stage["throughput"] < previous["throughput"] * (1 + SATURATION_GAIN):
+            return stage
+        previous = stage
+    return None
+
+def index_size():
+    from rag_core import read_vectorstore
+    with read_vectorstore() as vectorstore:
+        return vectorstore._collection.count()
+
+def prepare_index(upload_files):
+    """Index upload_files once so the first stage already retrieves from them; returns the index size"""
+    if upload_files:
+        from rag_core import load_and_split_documents, index_documents
+        print(f"Indexing {len(upload_files)} files before the first stage...")
+        start = time.perf_counter()
+        result = load_and_split_documents(upload_files)
+        if result["status"] == "success":
+            index_documents(result["splits"])
+        else:
+            print(f"Warning: {result['message']}")
+        print(f"Indexed in {time.perf_counter() - start:.1f}s")
+    return index_size()
+
+def run_load_test(args):
+    if args.stand_in:
+        # Must be set before rag_core / ollama_clients are imported
+        os.environ["OLLAMA_BASE_URL"] = start_stand_in(args.stand_in_chat_latency, args.stand_in_embed_latency)
+        print(f"Using stand-in backend at {os.environ['OLLAMA_BASE_URL']}")
+
+    if args.questions:
+        from batch_query import load_questions
+        questions = [q["question"] for q in load_questions(args.questions)]
+    else:
+        questions = DEFAULT_QUESTIONS
+
+    upload_files = []
+    if args.upload_dir:
+        for root, _, files in os.walk(args.upload_dir):
+            upload_files.extend(os.path.join(root, f) for f in files)
+
+    chunks = prepare_index(upload_files)
+    if chunks == 0 and not args.allow_empty_index:
+        print("The index is empty, so every answer would be retrieved from nothing. Pass --upload-dir or --persist-dir, or --allow-empty-index to run anyway.")
+        return
+    print(f"Index holds {chunks} chunks.")
+
+    stages = []
+    print(f"{'sessions':>8} {'answers':>8} {'err':>5} {'ans/s':>7} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'uploads':>8} {'cpu %':>7} {'stage rss MB':>13}")
+    for sessions in [int(s) for s in args.stages.split(",")]:
+        stage = run_stage(sessions, questions, args.stage_seconds, args.think_time, upload_files, args.upload_interval)
+        stages.append(stage)
+        print(
+            f"{stage['sessions']:>8} {stage['answers']:>8} {stage['errors']:>5} {stage['throughput']:>7.2f} "
+            f"{stage['p50']:>7.2f} {stage['p95']:>7.2f} {stage['p99']:>7.2f} {stage['uploads']:>8} "
+            f"{stage['cpu_percent']:>7.0f} {format_mb(stage['stage_peak_rss_mb']):>13}"
+        )
+        if stage["sample_error"]:
+            print(f"         first error: {stage['sample_error']}")
+
+    process_peak = process_peak_rss_mb()
+    print(f"Process peak RSS over the whole run: {format_mb(process_peak)} MB")
+    saturation = find_saturation(stages, args.p95_target)
+    if saturation:
+        print(f"Saturation at {saturation['sessions']} sessions (p95 {saturation['p95']:.2f}s, {saturation['throughput']:.2f} answers/s).")
+    else:
+        print("No saturation reached; extend --stages to find the limit.")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "stages": stages,
+                "saturation_sessions": saturation["sessions"] if saturation else None,
+                "process_peak_rss_mb": process_peak
+            }, f, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramp concurrent chat sessions and report where latency saturates.")
+    parser.add_argument("--stages", default="1,2,4,8,16", help="Comma-separated session counts")
+    parser.add_argument("--stage-seconds", type=float, default=30)
+    parser.add_argument("--think-time", type=float, default=1.0, help="Mean pause between a session's questions, in seconds")
+    parser.add_argument("--questions", help="JSONL/CSV question file (see batch_query.py); defaults to a built-in mix")
+    parser.add_argument("--upload-dir", help="Folder of documents indexed before the first stage and re-ingested in the background during every stage")
+    parser.add_argument("--allow-empty-index", action="store_true", help="Run even if the index has no chunks")
+    parser.add_argument("--upload-interval", type=float, default=10.0)
+    parser.add_argument("--p95-target", type=float, default=10.0, help="Acceptable p95 answer latency, in seconds")
+    parser.add_argument("--stand-in", action="store_true", help="Use a local stand-in model backend")
+    parser.add_argument("--stand-in-chat-latency", type=float, default=0.5)
+    parser.add_argument("--stand-in-embed-latency", type=float, default=0.02)
+    parser.add_argument("--persist-dir", help="Index folder to use; defaults to a temporary folder deleted afterwards")
+    parser.add_argument("--json", help="Also write the stage results to this file")
+    args = parser.parse_args()
+
+    # Must be set before rag_core is imported
+    persist_dir = args.persist_dir or tempfile.mkdtemp(prefix="load_test_index_")
+    os.environ["CHROMA_PERSIST_DIRECTORY"] = persist_dir
+    print(f"Using index at {persist_dir}")
+    try:
+        run_load_test(args)
+    finally:
+        if not args.persist_dir:
+            try:
+                shutil.rmtree(persist_dir)
+            except OSError as e:
+                print(f"Warning: Could not remove temporary index {persist_dir}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Shared Ollama client layer.
+
+One ChatOllama / OllamaEmbeddings instance is kept per model, so every caller
+reuses the same pooled keep-alive HTTP connections instead of opening new
+ones. Models are warmed in a background thread at startup and kept loaded
+for KEEP_ALIVE between requests.
+
+Each model has a concurrency limit. Background work (ingestion, batch jobs)
+may only use part of it, so interactive chat always has a free slot. The
+background share is capped at one less than the model's limit; with a
+single slot (e.g. OLLAMA_NUM_PARALLEL=1) background work has to share it,
+and chat may wait behind it.
+Time spent waiting for a slot is recorded and exposed via get_queue_stats().
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+OLLAMA_BASE_URL = os.environ.get("OLLAMA_BASE_URL", "http://localhost:11434")
+KEEP_ALIVE = int(os.environ.get("OLLAMA_KEEP_ALIVE", "1800")) # Seconds Ollama keeps a model loaded after a request
+MODEL_CONCURRENCY = max(1, int(os.environ.get("OLLAMA_MODEL_CONCURRENCY", "4"))) # Concurrent requests per model
+BACKGROUND_CONCURRENCY = max(1, min(int(os.environ.get("OLLAMA_BACKGROUND_CONCURRENCY", str(MODEL_CONCURRENCY - 1))), MODEL_CONCURRENCY - 1))
+MAX_CONNECTIONS = 16
+
+if MODEL_CONCURRENCY == 1:
+    print("Warning: OLLAMA_MODEL_CONCURRENCY is 1, so background work shares the only slot and chat may wait behind it.")
+
+_clients = {}
+_slots = {}
+_stats = {}
+_lock = threading.Lock()
+_warm_thread = None
+
+def _client_kwargs():
+    import httpx
+    return {
+        "limits": httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        "timeout": httpx.Timeout(None, connect=10.0)
+    }
+
+def get_chat_model(model_name):
+    """Return the shared ChatOllama client for model_name"""
+    key = ("chat", model_name)
+    with _lock:
+        if key not in _clients:
+            from langchain_ollama import ChatOllama
+            _clients[key] = ChatOllama(
+                model=model_name,
+                base_url=OLLAMA_BASE_URL,
+                keep_alive=KEEP_ALIVE,
+                client_kwargs=_client_kwargs()
+            )
+        return _clients[key]
+
+def get_embedding_model(model_name):
+    """Return the shared OllamaEmbeddings client for model_name"""
+    key = ("embed", model_name)
+    with _lock:
+        if key not in _clients:
+            from langchain_ollama import OllamaEmbeddings
+            _clients[key] = OllamaEmbeddings(
+                model=model_name,
+                base_url=OLLAMA_BASE_URL,
+                keep_alive=KEEP_ALIVE,
+                client_kwargs=_client_kwargs()
+            )
+        return _clients[key]
+
+def _get_slots(model_name):
+    with _lock:
+        if model_name not in _slots:
+            _slots[model_name] = {
+                "total": threading.BoundedSemaphore(MODEL_CONCURRENCY),
+                "background": threading.BoundedSemaphore(BACKGROUND_CONCURRENCY)
+            }
+        return _slots[model_name]
+
+def _record_wait(model_name, lane, waited):
+    with _lock:
+        stats = _stats.setdefault((model_name, lane), {"requests": 0, "total_wait": 0.0, "max_wait": 0.0, "last_wait": 0.0})
+        stats["requests"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        stats["last_wait"] = waited
+
+@contextmanager
+def model_slot(model_name, background=False):
+    """
+    Hold one of model_name's concurrency slots for the duration of the block.
+    Background callers first take a background slot, so they can never hold
+    every slot of the model at once.
+    """
+    slots = _get_slots(model_name)
+    lane = "background" if background else "interactive"
+    start = time.perf_counter()
+    if background:
+        slots["background"].acquire()
+    try:
+        slots["total"].acquire()
+        _record_wait(model_name, lane, time.perf_counter() - start)
+        try:
+            yield
+        finally:
+            slots["total"].release()
+    finally:
+        if background:
+            slots["background"].release()
+
+def get_queue_stats():
+    """Return queue wait statistics per model and lane, in seconds"""
+    with _lock:
+        return {
+            f"{model_name}/{lane}": {
+                "requests": s["requests"],
+                "avg_wait": s["total_wait"] / s["requests"] if s["requests"] else 0.0,
+                "max_wait": s["max_wait"],
+                "last_wait": s["last_wait"]
+            }
+            for (model_name, lane), s in _stats.items()
+        }
+
+def warm_model(model_name, embedding=False):
+    """Load a model into Ollama memory so the first real request does not pay the load time"""
+    try:
+        import ollama
+        client = ollama.Client(host=OLLAMA_BASE_URL)
+        if embedding:
+            client.embed(model=model_name, input="warmup", keep_alive=KEEP_ALIVE)
+        else:
+            # An empty prompt only loads the model
+            client.generate(model=model_name, prompt="", keep_alive=KEEP_ALIVE)
+    except Exception as e:
+        print(f"Warning: Could not warm model {model_name}: {e}")
+
+def warm_models_async(chat_models=(), embedding_models=()):
+    """Warm the given models in a background thread, once per process"""
+    global _warm_thread
+    with _lock:
+        if _warm_thread is not None:
+            return _warm_thread
+
+        def run():
+            for model_name in embedding_models:
+                warm_model(model_name, embedding=True)
+            for model_name in chat_models:
+                warm_model(model_name)
+
+        _warm_thread = threading.Thread(target=run, name="ollama-warmup", daemon=True)
+        _warm_thread.start()
+        return _warm_thread
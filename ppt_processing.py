@@ -0,0 +1,119 @@
+import os
+from langchain_core.documents import Document
+from typing import List
+
+def iter_shapes(shapes):
+    """Yield every shape on a slide, descending into grouped shapes"""
+    from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_shapes(shape.shapes)
+        else:
+            yield shape
+
+def table_to_text(table):
+    """Render a slide table as pipe-separated rows"""
+    rows = []
+    for row in table.rows:
+        cells = [cell.text.strip().replace("\n", " ") for cell in row.cells]
+        rows.append(" | ".join(cells))
+    return "\n".join(rows)
+
+def extract_slide_content(slide):
+    """
+    Extract the title, body text, tables and speaker notes of a slide.
+    Returns a dict with 'title', 'body', 'tables', 'notes' and 'pictures'.
+    """
+    from pptx.shapes.picture import Picture
+
+    title_shape = slide.shapes.title
+    title = title_shape.text.strip() if title_shape is not None and title_shape.has_text_frame else ""
+
+    body, tables, pictures = [], [], []
+    for shape in iter_shapes(slide.shapes):
+        if title_shape is not None and shape.shape_id == title_shape.shape_id:
+            continue
+        if shape.has_text_frame:
+            text = shape.text_frame.text.strip()
+            if text:
+                body.append(text)
+        if shape.has_table:
+            tables.append(table_to_text(shape.table))
+        if isinstance(shape, Picture):
+            pictures.append(shape)
+
+    notes = ""
+    if slide.has_notes_slide:
+        # Notes pages without a body placeholder have no text frame
+        notes_frame = slide.notes_slide.notes_text_frame
+        if notes_frame is not None:
+            notes = notes_frame.text.strip()
+
+    return {"title": title, "body": body, "tables": tables, "notes": notes, "pictures": pictures}
+
+def format_slide_text(slide_number, content):
+    """Build the page_content for a slide"""
+    parts = [f"Slide {slide_number}: {content['title']}" if content["title"] else f"Slide {slide_number}"]
+    if content["body"]:
+        parts.append("\n".join(content["body"]))
+    for table_text in content["tables"]:
+        parts.append(f"Table:\n{table_text}")
+    if content["notes"]:
+        parts.append(f"Speaker notes:\n{content['notes']}")
+    return "\n\n".join(parts)
+
+def save_slide_images(pictures, image_dir, slide_number):
+    """Write a slide's embedded images to image_dir and return their paths"""
+    paths = []
+    os.makedirs(image_dir, exist_ok=True)
+    for i, picture in enumerate(pictures):
+        image = picture.image
+        path = os.path.join(image_dir, f"slide{slide_number}_image{i + 1}.{image.ext}")
+        with open(path, "wb") as f:
+            f.write(image.blob)
+        paths.append(path)
+    return paths
+
+def create_documents_from_pptx(file_path, extract_images=False, image_dir=None) -> List[Document]:
+    """
+    Create one Document per slide of a PPTX deck.
+    With extract_images=True, embedded pictures are written to image_dir
+    (default: '<deck>_images' next to the deck) and their paths are listed
+    in each slide's 'image_paths' metadata for captioning.
+    """
+    from pptx import Presentation
+
+    filename = os.path.basename(file_path)
+    if extract_images and image_dir is None:
+        image_dir = os.path.splitext(file_path)[0] + "_images"
+
+    try:
+        presentation = Presentation(file_path)
+    except Exception as e:
+        raise ValueError(f"Error loading {file_path}: {str(e)}")
+
+    total_slides = len(presentation.slides)
+    docs = []
+    for slide_number, slide in enumerate(presentation.slides, start=1):
+        content = extract_slide_content(slide)
+        has_text = content["title"] or content["body"] or content["tables"] or content["notes"]
+        if not has_text and not (extract_images and content["pictures"]):
+            continue
+
+        metadata = {
+            "source": file_path,
+            "filename": filename,
+            "type": "slide",
+            "extension": os.path.splitext(filename)[1].lower(),
+            "slide_number": slide_number,
+            "total_slides": total_slides,
+            "title": content["title"],
+            "has_notes": bool(content["notes"])
+        }
+        if extract_images and content["pictures"]:
+            metadata["image_paths"] = "; ".join(save_slide_images(content["pictures"], image_dir, slide_number))
+
+        docs.append(Document(page_content=format_slide_text(slide_number, content), metadata=metadata))
+
+    return docs
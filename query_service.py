@@ -0,0 +1,265 @@
+"""
+Headless HTTP service for the knowledge base.
+
+Exposes the rag_core query and ingest functions over HTTP so other systems
+(the LMS integration, batch tools, the Streamlit app) can share one process:
+
+    POST /query   {"question": "...", "stream": false}
+    POST /ingest  {"paths": ["knowledge_base/Finance/notes.pdf", ...]}
+    POST /reset   {}
+    GET  /health
+
+Identical questions that arrive while one is already being answered share
+that single retrieval and LLM call. With "stream": true the answer is sent
+as newline-delimited JSON events (sources, then tokens, then done).
+Admission control caps the number of distinct queries running and waiting;
+beyond that the service answers 503 with a Retry-After header. Ingestion only
+accepts files inside the knowledge base folder (KB_DIR).
+
+When the Streamlit app runs with QUERY_SERVICE_URL set, it sends chat,
+ingestion and resets here, so the service is the only process writing to the
+index. The app and the service must share the knowledge base folder and run
+from the same working directory, since paths are sent as the app saved them.
+
+Usage:
+    python query_service.py --host 0.0.0.0 --port 8600
+"""
+import os
+import json
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from rag_core import retrieve_documents, stream_answer, load_and_split_documents, index_documents, clear_database
+from ollama_clients import get_queue_stats
+
+MAX_ACTIVE_QUERIES = int(os.environ.get("SERVICE_MAX_ACTIVE_QUERIES", "4"))
+MAX_QUEUED_QUERIES = int(os.environ.get("SERVICE_MAX_QUEUED_QUERIES", "16"))
+MAX_ACTIVE_INGESTS = 1
+KB_DIR = os.environ.get("SERVICE_KB_DIR", "knowledge_base")
+RETRY_AFTER_SECONDS = 5
+
+def serialize_docs(docs):
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+
+def resolve_kb_path(path, kb_dir):
+    """Real path of path if it is an existing file inside kb_dir, else None"""
+    kb_root = os.path.realpath(kb_dir)
+    resolved = os.path.realpath(path)
+    if os.path.commonpath([kb_root, resolved]) != kb_root or not os.path.isfile(resolved):
+        return None
+    return resolved
+
+def normalize_question(question):
+    """Key used to coalesce identical in-flight questions"""
+    return " ".join(question.lower().split())
+
+class InflightQuery:
+    """
+    One running query shared by every request that asked the same question.
+    Events (sources, tokens, done/error) are kept so late subscribers can
+    replay them before waiting for new ones.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self.changed = asyncio.Event()
+
+    def publish(self, event):
+        self.events.append(event)
+        if event["type"] in ("done", "error"):
+            self.finished = True
+        # Wake current waiters and arm a fresh event for the next publish
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.finished:
+                return
+            await self.changed.wait()
+
+class QueryService:
+    def __init__(self, max_active=MAX_ACTIVE_QUERIES, max_queued=MAX_QUEUED_QUERIES):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.query_slots = asyncio.Semaphore(max_active)
+        self.ingest_slots = asyncio.Semaphore(MAX_ACTIVE_INGESTS)
+        self.executor = ThreadPoolExecutor(max_workers=max_active + MAX_ACTIVE_INGESTS)
+        self.inflight = {}
+        self.admitted = 0
+        self.coalesced = 0
+
+    def _run_query(self, loop, query, question):
+        """Retrieve and stream one answer on a worker thread, publishing events to the loop"""
+        def publish(event):
+            loop.call_soon_threadsafe(query.publish, event)
+
+        try:
+            source_docs = retrieve_documents(question)
+            publish({"type": "sources", "sources": serialize_docs(source_docs)})
+            for token in stream_answer(question, source_docs):
+                publish({"type": "token", "text": token})
+            publish({"type": "done"})
+        except Exception as e:
+            publish({"type": "error", "message": str(e)})
+
+    async def _drive(self, key, query, question):
+        try:
+            async with self.query_slots:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self.executor, self._run_query, loop, query, question)
+        finally:
+            self.admitted -= 1
+            self.inflight.pop(key, None)
+
+    def start_query(self, question):
+        """Join an identical in-flight query or admit a new one; None if the service is full"""
+        key = normalize_question(question)
+        query = self.inflight.get(key)
+        if query is not None:
+            self.coalesced += 1
+            return query
+
+        if self.admitted >= self.max_active + self.max_queued:
+            return None
+
+        query = InflightQuery()
+        self.inflight[key] = query
+        self.admitted += 1
+        asyncio.ensure_future(self._drive(key, query, question))
+        return query
+
+    async def handle_query(self, request):
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": "Request body must be JSON."}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "Request body must be a JSON object."}, status=400)
+        question = body.get("question")
+        question = question.strip() if isinstance(question, str) else ""
+        if not question:
+            return web.json_response({"error": "Missing 'question'."}, status=400)
+
+        query = self.start_query(question)
+        if query is None:
+            return web.json_response(
+                {"error": "Service is at capacity, try again shortly."},
+                status=503,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            async for event in query.subscribe():
+                await response.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+            await response.write_eof()
+            return response
+
+        answer_parts = []
+        sources = []
+        async for event in query.subscribe():
+            if event["type"] == "sources":
+                sources = event["sources"]
+            elif event["type"] == "token":
+                answer_parts.append(event["text"])
+            elif event["type"] == "error":
+                return web.json_response({"error": event["message"]}, status=500)
+        return web.json_response({"answer": "".join(answer_parts), "sources": sources})
+
+    def _run_ingest(self, file_paths):
+        result = load_and_split_documents(file_paths)
+        folded = 0
+        if result["status"] == "success":
+            folded = index_documents(result["splits"])
+        return {
+            "status": result["status"],
+            "message": result.get("message", ""),
+            "chunks": len(result["splits"]),
+            "failed": result["failed"],
+            "ignored": result["ignored"],
+            "dedup": result.get("dedup", {}),
+            "folded_into_index": folded
+        }
+
+    async def handle_ingest(self, request):
+        try:
+            body = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": "Request body must be JSON."}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "Request body must be a JSON object."}, status=400)
+        paths = body.get("paths")
+        if not paths or not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+            return web.json_response({"error": "Provide a list of file 'paths'."}, status=400)
+        resolved = [resolve_kb_path(p, KB_DIR) for p in paths]
+        rejected = [p for p, r in zip(paths, resolved) if r is None]
+        if rejected:
+            return web.json_response(
+                {"error": f"Paths must be existing files inside '{KB_DIR}'.", "rejected": rejected},
+                status=400
+            )
+        file_paths = resolved
+
+        if self.ingest_slots.locked():
+            return web.json_response(
+                {"error": "An ingestion is already running, try again shortly."},
+                status=503,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        async with self.ingest_slots:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, self._run_ingest, file_paths)
+        return web.json_response(result)
+
+    async def handle_reset(self, request):
+        # Shares the ingest slot, so a reset never races an ingestion
+        if self.ingest_slots.locked():
+            return web.json_response(
+                {"error": "An ingestion is running, try again shortly."},
+                status=503,
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+        async with self.ingest_slots:
+            loop = asyncio.get_running_loop()
+            message = await loop.run_in_executor(self.executor, clear_database)
+        return web.json_response({"status": "success", "message": message})
+
+    async def handle_health(self, request):
+        return web.json_response({
+            "status": "ok",
+            "inflight_queries": len(self.inflight),
+            "admitted_queries": self.admitted,
+            "coalesced_queries": self.coalesced,
+            "model_queues": get_queue_stats()
+        })
+
+def create_app(service=None):
+    service = service or QueryService()
+    app = web.Application()
+    app.add_routes([
+        web.post("/query", service.handle_query),
+        web.post("/ingest", service.handle_ingest),
+        web.post("/reset", service.handle_reset),
+        web.get("/health", service.handle_health),
+    ])
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the knowledge base HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,62 @@
 import os
-import shutil
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredPowerPointLoader, UnstructuredExcelLoader, CSVLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_ollama import OllamaEmbeddings, ChatOllama
-from langchain_chroma import Chroma
-from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-
-# Import our new modules
-from image_processing import generate_image_description, create_image_document
-from table_processing import create_documents_from_dataframe
+from contextlib import contextmanager
+
+from ollama_clients import get_chat_model, get_embedding_model, model_slot
+
+# Format loaders, model clients and the vector store are imported inside the
+# functions that use them, so importing rag_core (and rendering the first
+# page of the app) does not pull in langchain_community, unstructured,
+# chromadb or pandas. See bench_startup.py for the import-time budget.
 
 # Constants
-PERSIST_DIRECTORY = "./chroma_db"
+PERSIST_DIRECTORY = os.environ.get("CHROMA_PERSIST_DIRECTORY", "./chroma_db")
 COLLECTION_NAME = "local_knowledge_base"
 MODEL_NAME = "llama3.2:1b" # Text-only model for non-vision tasks
 MULTIMODAL_MODEL = "llava:7b" # Vision-capable model for images
 EMBEDDING_MODEL = "nomic-embed-text" # Good for RAG
+PPTX_CAPTION_IMAGES = False # Caption images embedded in slides with the multimodal model
+ALLOWED_EXTENSIONS = {".pdf", ".docx", ".pptx", ".ppt", ".xlsx", ".csv", ".jpg", ".jpeg", ".png", ".gif", ".webp"}
 
 def get_llm(model_name=MODEL_NAME):
     """Get text-only LLM"""
-    return ChatOllama(model=model_name)
+    return get_chat_model(model_name)
 
 def get_multimodal_llm(model_name=MULTIMODAL_MODEL):
     """Get vision-capable LLM for image processing"""
-    return ChatOllama(model=model_name)
+    return get_chat_model(model_name)
 
 def get_embeddings(model_name=EMBEDDING_MODEL):
-    return OllamaEmbeddings(model=model_name)
+    return get_embedding_model(model_name)
 
-def initialize_vectorstore():
+def open_vectorstore(persist_directory):
+    from langchain_chroma import Chroma
     embeddings = get_embeddings()
-    if not os.path.exists(PERSIST_DIRECTORY):
-        os.makedirs(PERSIST_DIRECTORY)
+    if not os.path.exists(persist_directory):
+        os.makedirs(persist_directory)
     
     vectorstore = Chroma(
-        persist_directory=PERSIST_DIRECTORY,
+        persist_directory=persist_directory,
         embedding_function=embeddings,
         collection_name=COLLECTION_NAME
     )
     return vectorstore
 
+def get_index_coordinator():
+    """The process-wide single writer for the index (see index_writer)"""
+    from index_writer import get_index_coordinator as _get_coordinator
+    from dedup import IndexDeduplicator
+    return _get_coordinator(PERSIST_DIRECTORY, open_vectorstore, EMBEDDING_MODEL, IndexDeduplicator)
+
+def initialize_vectorstore():
+    """Open the current index generation. Writes should go through get_index_coordinator()"""
+    return open_vectorstore(get_index_coordinator().current_directory())
+
+@contextmanager
+def read_vectorstore():
+    """Open the current index generation and keep it alive until the block exits, even across a reset"""
+    with get_index_coordinator().read_lease() as persist_directory:
+        yield open_vectorstore(persist_directory)
+
 def clean_pdf_content(docs):
     """Remove lines containing 'BPGP 2024-26 Batch' from PDF documents"""
     cleaned_docs = []
@@ -53,12 +68,14 @@ def clean_pdf_content(docs):
     return cleaned_docs
 
 def process_pdf(file_path):
+    from langchain_community.document_loaders import PyPDFLoader
     loader = PyPDFLoader(file_path)
     docs = loader.load()
     return clean_pdf_content(docs)
 
 def process_docx(file_path):
     """Process DOCX and remove headers/footers"""
+    from langchain_community.document_loaders import Docx2txtLoader
     try:
         from docx import Document
         import tempfile
@@ -97,17 +114,44 @@ def process_docx(file_path):
         return loader.load()
 
 def process_ppt(file_path):
+    """Process PPTX decks slide by slide with python-pptx"""
+    if os.path.splitext(file_path)[1].lower() == ".pptx":
+        try:
+            from ppt_processing import create_documents_from_pptx
+            docs = create_documents_from_pptx(file_path, extract_images=PPTX_CAPTION_IMAGES)
+            if PPTX_CAPTION_IMAGES:
+                docs.extend(caption_slide_images(docs))
+            return docs
+        except Exception as e:
+            # Fallback to basic loading if slide extraction fails
+            print(f"Warning: Slide extraction failed, using fallback: {e}")
+    
+    # Legacy .ppt files are not readable by python-pptx
+    from langchain_community.document_loaders import UnstructuredPowerPointLoader
     loader = UnstructuredPowerPointLoader(file_path)
     return loader.load()
 
+def caption_slide_images(slide_docs):
+    """Create image documents for pictures extracted from slides"""
+    image_docs = []
+    for doc in slide_docs:
+        for image_path in filter(None, doc.metadata.get("image_paths", "").split("; ")):
+            for image_doc in process_image(image_path):
+                image_doc.metadata["deck_source"] = doc.metadata["source"]
+                image_doc.metadata["slide_number"] = doc.metadata["slide_number"]
+                image_docs.append(image_doc)
+    return image_docs
+
 def process_excel(file_path):
     """Process Excel files with enhanced pandas-based chunking"""
     try:
         # Use our new table processing module for better handling
+        from table_processing import create_documents_from_dataframe
         return create_documents_from_dataframe(file_path, chunk_size=50)
     except Exception as e:
         # Fallback to basic loading if enhanced processing fails
         print(f"Warning: Enhanced XLSX processing failed, using fallback: {e}")
+        from langchain_community.document_loaders import UnstructuredExcelLoader
         loader = UnstructuredExcelLoader(file_path)
         return loader.load()
 
@@ -115,21 +159,25 @@ def process_csv(file_path):
     """Process CSV files with enhanced pandas-based chunking"""
     try:
         # Use our new table processing module for better handling
+        from table_processing import create_documents_from_dataframe
         return create_documents_from_dataframe(file_path, chunk_size=50)
     except Exception as e:
         # Fallback to basic loading if enhanced processing fails
         print(f"Warning: Enhanced CSV processing failed, using fallback: {e}")
+        from langchain_community.document_loaders import CSVLoader
         loader = CSVLoader(file_path)
         return loader.load()
 
 def process_image(file_path):
     """Process image files using multimodal LLM"""
+    from image_processing import generate_image_description, create_image_document
     try:
         # Get vision-capable model
         llm = get_multimodal_llm()
         
-        # Generate description
-        description = generate_image_description(file_path, llm)
+        # Generate description (ingestion runs in the background lane)
+        with model_slot(llm.model, background=True):
+            description = generate_image_description(file_path, llm)
         
         # Create document with description
         return [create_image_document(file_path, description)]
@@ -161,12 +209,11 @@ def load_file(file_path):
     else:
         raise ValueError(f"Unsupported file type: {ext}")
 
-def load_and_split_documents(file_paths, progress_callback=None):
+def load_and_split_documents(file_paths, progress_callback=None, deduplicate=True):
     all_docs = []
     failed_files = []
     ignored_files = []
     
-    ALLOWED_EXTENSIONS = {".pdf", ".docx", ".pptx", ".ppt", ".xlsx", ".csv", ".jpg", ".jpeg", ".png", ".gif", ".webp"}
     total_files = len(file_paths)
     
     for i, file_path in enumerate(file_paths):
@@ -191,30 +238,63 @@ def load_and_split_documents(file_paths, progress_callback=None):
     if not all_docs:
         return {"status": "error", "message": "No valid documents loaded.", "failed": failed_files, "ignored": ignored_files, "splits": []}
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    splits = text_splitter.split_documents(all_docs)
+    if not deduplicate:
+        return {"status": "success", "splits": split_documents(all_docs), "failed": failed_files, "ignored": ignored_files}
+
+    splits, dedup_stats = split_and_deduplicate(all_docs)
     
     return {
         "status": "success",
         "splits": splits,
         "failed": failed_files,
-        "ignored": ignored_files
+        "ignored": ignored_files,
+        "dedup": dedup_stats
     }
 
+def split_documents(docs):
+    """Split documents with the policy for their type (see splitting.py)"""
+    from splitting import split_documents as split_by_policy
+    return split_by_policy(docs)
+
+def split_and_deduplicate(docs):
+    """Split documents into chunks and fold near-duplicate chunks into one canonical chunk"""
+    from dedup import deduplicate_chunks
+    return deduplicate_chunks(split_documents(docs))
+
+def merge_split_results(results):
+    """
+    Combine several load_and_split_documents results into one.
+    Near-duplicates are folded once across all of the combined splits, so
+    the results should be loaded with deduplicate=False.
+    """
+    from dedup import deduplicate_chunks
+    merged = {"status": "error", "message": "No valid documents loaded.", "splits": [], "failed": [], "ignored": []}
+    for result in results:
+        merged["splits"].extend(result["splits"])
+        merged["failed"].extend(result["failed"])
+        merged["ignored"].extend(result["ignored"])
+    merged["splits"], merged["dedup"] = deduplicate_chunks(merged["splits"])
+    if merged["splits"]:
+        merged["status"] = "success"
+        del merged["message"]
+    return merged
+
 def index_documents(splits):
+    """Index chunks; returns how many were folded into near-duplicates already in the index"""
     if not splits:
-        return
+        return 0
         
-    vectorstore = initialize_vectorstore()
-    vectorstore.add_documents(documents=splits)
+    # Queued behind other sessions' writes and merged with them into one upsert
+    added = get_index_coordinator().add_documents(splits).result()
+    return len(splits) - added
 
 def ingest_files(file_paths):
     # Backward compatibility wrapper
     result = load_and_split_documents(file_paths)
     if result["status"] == "success":
-        index_documents(result["splits"])
+        folded = index_documents(result["splits"])
         
-        success_msg = f"Successfully ingested {len(file_paths) - len(result['failed']) - len(result['ignored'])} files ({len(result['splits'])} chunks)."
+        success_msg = f"Successfully ingested {len(file_paths) - len(result['failed']) - len(result['ignored'])} files ({len(result['splits'])} chunks, {result['dedup']['duplicates_removed'] + folded} duplicates removed)."
         if result['ignored']:
             success_msg += f" Ignored: {', '.join(result['ignored'])}."
             
@@ -225,13 +305,7 @@ def ingest_files(file_paths):
         }
     return result
 
-def query_rag(question):
-    vectorstore = initialize_vectorstore()
-    retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 4})
-    
-    llm = get_llm()
-    
-    template = """Your a MBA Knowledge Base. Use the following pieces of context to answer the question at the end to the students. 
+RAG_PROMPT_TEMPLATE = """Your a MBA Knowledge Base. Use the following pieces of context to answer the question at the end to the students. 
     If you don't know the answer, just say that you don't know, don't try to make up an answer. 
     Use three sentences maximum and keep the answer concise.
     
@@ -240,31 +314,65 @@ def query_rag(question):
     Question: {question}
     
     Helpful Answer:"""
+
+def format_docs(docs):
+    """Join retrieved documents into a single context string"""
+    return "\n\n".join(doc.page_content for doc in docs)
+
+def build_answer_chain(source_docs, llm):
+    """Create the answer chain over already-retrieved documents"""
+    from langchain_core.prompts import PromptTemplate
+    from langchain_core.runnables import RunnablePassthrough
+    from langchain_core.output_parsers import StrOutputParser
     
-    prompt = PromptTemplate.from_template(template)
-    
-    # Helper function to format documents
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-    
-    # Get source documents first
-    source_docs = retriever.invoke(question)
+    prompt = PromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
     
     # Create RAG chain using LCEL (LangChain Expression Language)
-    rag_chain = (
+    return (
         {"context": lambda x: format_docs(source_docs), "question": RunnablePassthrough()}
         | prompt
         | llm
         | StrOutputParser()
     )
+
+def generate_answer(question, source_docs, llm=None, background=False):
+    """
+    Run the answer chain for a question over already-retrieved documents.
+    Bulk callers pass background=True so they cannot take every LLM slot.
+    """
+    if llm is None:
+        llm = get_llm()
+    
+    rag_chain = build_answer_chain(source_docs, llm)
+    with model_slot(llm.model, background=background):
+        return rag_chain.invoke(question)
+
+def stream_answer(question, source_docs, llm=None):
+    """Like generate_answer, but yield the answer text as it is generated"""
+    if llm is None:
+        llm = get_llm()
+    
+    rag_chain = build_answer_chain(source_docs, llm)
+    with model_slot(llm.model):
+        for chunk in rag_chain.stream(question):
+            yield chunk
+
+def retrieve_documents(question, k=4):
+    """Return the k most similar chunks for a question"""
+    with read_vectorstore() as vectorstore:
+        retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": k})
+        
+        with model_slot(EMBEDDING_MODEL):
+            return retriever.invoke(question)
+
+def query_rag(question):
+    # Get source documents first
+    source_docs = retrieve_documents(question)
     
     # Get answer
-    answer = rag_chain.invoke(question)
+    answer = generate_answer(question, source_docs)
     
     return answer, source_docs
 
 def clear_database():
-    if os.path.exists(PERSIST_DIRECTORY):
-        shutil.rmtree(PERSIST_DIRECTORY)
-        return "Database cleared."
-    return "Database already empty."
+    return get_index_coordinator().clear().result()
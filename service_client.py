@@ -0,0 +1,55 @@
+"""
+Minimal client for query_service, using only the standard library.
+"""
+import json
+import urllib.error
+import urllib.request
+
+TIMEOUT_SECONDS = 300
+INGEST_TIMEOUT_SECONDS = 3600 # Large ZIPs are parsed and embedded before the service answers
+
+def _post(base_url, path, payload, timeout=TIMEOUT_SECONDS):
+    request = urllib.request.Request(
+        base_url.rstrip("/") + path,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    try:
+        return urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        # Surface the service's own error message (400 bad request, 503 busy)
+        try:
+            message = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+        except ValueError:
+            message = e.reason
+        raise RuntimeError(f"Query service returned {e.code}: {message}") from e
+
+def query_remote(base_url, question):
+    """Same return shape as rag_core.query_rag: (answer, source_docs)"""
+    from langchain_core.documents import Document
+
+    with _post(base_url, "/query", {"question": question}) as response:
+        result = json.loads(response.read().decode("utf-8"))
+    source_docs = [Document(page_content=s["page_content"], metadata=s["metadata"]) for s in result["sources"]]
+    return result["answer"], source_docs
+
+def stream_query_remote(base_url, question):
+    """Yield the service's streaming events (sources, token, done, error) as dicts"""
+    with _post(base_url, "/query", {"question": question, "stream": True}) as response:
+        for line in response:
+            if line.strip():
+                yield json.loads(line.decode("utf-8"))
+
+def ingest_remote(base_url, file_paths):
+    """
+    Ask the service to ingest files it can read from its own filesystem.
+    The paths must lie inside the service's knowledge base folder.
+    """
+    with _post(base_url, "/ingest", {"paths": file_paths}, timeout=INGEST_TIMEOUT_SECONDS) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def reset_remote(base_url):
+    """Ask the service to clear the index it owns"""
+    with _post(base_url, "/reset", {}) as response:
+        return json.loads(response.read().decode("utf-8"))
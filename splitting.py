@@ -0,0 +1,193 @@
+"""
+Per-document-type splitting policies.
+
+- Table chunks, table summaries and image captions are already sized by
+  their producers and are never re-split.
+- PDF and DOCX text is cut into sections at heading lines; small sections
+  are packed together and only oversized sections are split further.
+- Everything else (slides, fallbacks) uses the recursive splitter, which
+  leaves documents under the chunk budget untouched.
+
+Chunk sizes are measured in model tokens. The tiktoken encoding is read
+from the tokenizer_cache folder shipped next to this file (tiktoken's own
+TIKTOKEN_CACHE_DIR mechanism), so nothing is downloaded at runtime; fill it
+once with `python splitting.py --fetch-tokenizer` on a machine with network
+access. The tokenizer is loaded once and token counts are memoised, since
+the splitter measures the same pieces of text many times while it merges
+them. Without the encoding file, counts fall back to an estimate of
+CHARS_PER_TOKEN characters per token and a warning is printed.
+
+Usage:
+    python splitting.py --fetch-tokenizer
+"""
+import os
+import re
+import math
+import hashlib
+import argparse
+from functools import lru_cache
+from langchain_core.documents import Document
+from typing import List
+
+CHUNK_TOKENS = 350
+CHUNK_OVERLAP_TOKENS = 35
+TOKENIZER_ENCODING = "cl100k_base"
+TOKENIZER_URL = "https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken"
+TOKENIZER_CACHE_DIR = os.environ.get("TIKTOKEN_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tokenizer_cache"))
+CHARS_PER_TOKEN = 4 # Fallback estimate when the encoding file is missing
+
+UNSPLIT_TYPES = {"table_summary", "table_chunk", "image"}
+HEADING_AWARE_EXTENSIONS = {".pdf", ".docx"}
+
+NUMBERED_HEADING = re.compile(r"^(\d+(\.\d+)*\.?|[IVX]+\.|[A-Z]\.)\s+\S")
+MAX_HEADING_CHARS = 80
+MAX_HEADING_WORDS = 10
+
+def tokenizer_file():
+    """Path tiktoken uses for the cached encoding (its cache key is the SHA-1 of the download URL)"""
+    return os.path.join(TOKENIZER_CACHE_DIR, hashlib.sha1(TOKENIZER_URL.encode()).hexdigest())
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    """Load the bundled tokenizer once; None (with a warning) if it is unavailable"""
+    if not os.path.exists(tokenizer_file()):
+        # Checked first, since tiktoken would otherwise try to download it
+        print(f"Warning: Tokenizer encoding not found in {TOKENIZER_CACHE_DIR}, estimating {CHARS_PER_TOKEN} characters per token. Run `python splitting.py --fetch-tokenizer` to bundle it.")
+        return None
+    try:
+        os.environ["TIKTOKEN_CACHE_DIR"] = TOKENIZER_CACHE_DIR
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        print(f"Warning: Tokenizer unavailable, estimating {CHARS_PER_TOKEN} characters per token: {e}")
+        return None
+
+@lru_cache(maxsize=65536)
+def count_tokens(text):
+    """Number of model tokens in text"""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+@lru_cache(maxsize=1)
+def get_text_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_TOKENS,
+        chunk_overlap=CHUNK_OVERLAP_TOKENS,
+        length_function=count_tokens
+    )
+
+def is_heading(line):
+    """Heuristic for a heading line in extracted PDF/DOCX text"""
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_CHARS or line[-1] in ".,;:":
+        return False
+    if NUMBERED_HEADING.match(line):
+        return True
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return True
+    words = line.split()
+    return len(words) <= MAX_HEADING_WORDS and all(w[0].isupper() or not w[0].isalpha() for w in words)
+
+def split_sections(text):
+    """Split text into (heading, section_text) pairs at heading lines"""
+    sections = []
+    heading, lines, has_body = "", [], False
+    previous = ""
+    for line in text.split("\n"):
+        # A heading only counts at the start of a block: after a blank line or a finished sentence.
+        # A line following a heading is its body, e.g. an author name under a title-case heading
+        starts_block = not previous.strip() or previous.rstrip()[-1] in ".?!:"
+        if starts_block and is_heading(line):
+            if has_body:
+                sections.append((heading, "\n".join(lines).strip()))
+                lines, has_body = [], False
+            heading = line.strip()
+        elif line.strip():
+            has_body = True
+        lines.append(line)
+        previous = line
+    if any(l.strip() for l in lines):
+        sections.append((heading, "\n".join(lines).strip()))
+    return sections
+
+def _make_chunk(doc, text, heading):
+    metadata = dict(doc.metadata)
+    if heading:
+        metadata["section"] = heading
+    return Document(page_content=text, metadata=metadata)
+
+def split_by_headings(doc):
+    """Pack heading-delimited sections into chunks of at most CHUNK_TOKENS"""
+    chunks = []
+    buffer, buffer_tokens, buffer_heading = [], 0, ""
+
+    def flush():
+        nonlocal buffer, buffer_tokens, buffer_heading
+        if buffer:
+            chunks.append(_make_chunk(doc, "\n\n".join(buffer), buffer_heading))
+        buffer, buffer_tokens, buffer_heading = [], 0, ""
+
+    for heading, section in split_sections(doc.page_content):
+        tokens = count_tokens(section)
+        if tokens > CHUNK_TOKENS:
+            flush()
+            # Repeat the heading on every piece of an oversized section
+            body = section[len(heading):].lstrip("\n") if heading and section.startswith(heading) else section
+            for piece in get_text_splitter().split_text(body):
+                chunks.append(_make_chunk(doc, f"{heading}\n{piece}" if heading else piece, heading))
+            continue
+        if buffer_tokens + tokens > CHUNK_TOKENS:
+            flush()
+        if not buffer:
+            buffer_heading = heading
+        buffer.append(section)
+        buffer_tokens += tokens
+    flush()
+    return chunks
+
+def split_document(doc):
+    """Apply the splitting policy for doc's type and return its chunks"""
+    if doc.metadata.get("type") in UNSPLIT_TYPES:
+        return [doc]
+    if not doc.page_content.strip():
+        return []
+
+    ext = doc.metadata.get("extension") or ""
+    if not ext:
+        source = str(doc.metadata.get("source", ""))
+        ext = source[source.rfind("."):].lower() if "." in source else ""
+    if ext in HEADING_AWARE_EXTENSIONS:
+        return split_by_headings(doc)
+
+    return get_text_splitter().split_documents([doc])
+
+def split_documents(docs) -> List[Document]:
+    """Split a list of documents, each according to its type"""
+    chunks = []
+    for doc in docs:
+        chunks.extend(split_document(doc))
+    return chunks
+
+def fetch_tokenizer():
+    """Download the encoding into TOKENIZER_CACHE_DIR so it can be shipped with the app"""
+    os.makedirs(TOKENIZER_CACHE_DIR, exist_ok=True)
+    os.environ["TIKTOKEN_CACHE_DIR"] = TOKENIZER_CACHE_DIR
+    import tiktoken
+    tiktoken.get_encoding(TOKENIZER_ENCODING)
+    return tokenizer_file()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the tokenizer used to size chunks.")
+    parser.add_argument("--fetch-tokenizer", action="store_true", help=f"Download the {TOKENIZER_ENCODING} encoding into {TOKENIZER_CACHE_DIR}")
+    args = parser.parse_args()
+    if args.fetch_tokenizer:
+        print(f"Saved {TOKENIZER_ENCODING} to {fetch_tokenizer()}")
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
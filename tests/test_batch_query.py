@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+import batch_query
+from batch_query import load_questions, compact_output, batch_query_rag
+
+def test_load_questions_keeps_falsy_ids_and_numbers_blank_ones(tmp_path):
+    path = tmp_path / "questions.jsonl"
+    rows = [{"id": 0, "question": "First?"}, {"id": "", "question": "Second?"}, {"question": "Third?"}, {"id": 7, "question": " "}]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+
+    questions = load_questions(str(path))
+
+    assert [q["id"] for q in questions] == ["0", "1", "2"]
+
+def test_load_questions_csv(tmp_path):
+    path = tmp_path / "questions.csv"
+    path.write_text("id,question\nq1,What is NPV?\n,What is IRR?\n  ,What is WACC?\n", encoding="utf-8")
+
+    questions = load_questions(str(path))
+
+    assert questions == [
+        {"id": "q1", "question": "What is NPV?"},
+        {"id": "1", "question": "What is IRR?"},
+        {"id": "2", "question": "What is WACC?"}
+    ]
+
+def test_load_questions_rejects_duplicate_ids(tmp_path):
+    path = tmp_path / "questions.csv"
+    path.write_text("id,question\nq1,What is NPV?\nq1,What is IRR?\n", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_questions(str(path))
+
+def test_compact_output_drops_errors_and_partial_lines(tmp_path):
+    path = tmp_path / "answers.jsonl"
+    path.write_text(
+        json.dumps({"id": "a", "status": "success", "answer": "x"}) + "\n"
+        + json.dumps({"id": "b", "status": "error", "error": "timeout"}) + "\n"
+        + '{"id": "c", "stat',
+        encoding="utf-8"
+    )
+
+    completed = compact_output(str(path))
+
+    assert completed == {"a"}
+    records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["id"] for r in records] == ["a"]
+
+def test_resume_answers_each_blank_id_row(tmp_path, monkeypatch):
+    questions_path = tmp_path / "questions.csv"
+    questions_path.write_text("id,question\n,What is NPV?\n,What is IRR?\n", encoding="utf-8")
+    output_path = str(tmp_path / "answers.jsonl")
+    failing = {"What is IRR?"}
+
+    def answer(question, docs, llm, background=False):
+        if question in failing:
+            raise RuntimeError("timeout")
+        return f"Answer to {question}"
+
+    monkeypatch.setattr(batch_query, "embed_questions", lambda questions: [[0.0]] * len(questions))
+    monkeypatch.setattr(batch_query, "retrieve_bulk", lambda vectors: [[] for _ in vectors])
+    monkeypatch.setattr(batch_query, "get_llm", lambda: None)
+    monkeypatch.setattr(batch_query, "generate_answer", answer)
+    questions = load_questions(str(questions_path))
+
+    first = batch_query_rag(questions, output_path, max_workers=1)
+    failing.clear()
+    second = batch_query_rag(questions, output_path, max_workers=1)
+
+    assert (first["answered"], first["failed"]) == (1, 1)
+    assert (second["skipped"], second["answered"]) == (1, 1)
+    compact_output(output_path)
+    with open(output_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert sorted(r["answer"] for r in records) == ["Answer to What is IRR?", "Answer to What is NPV?"]
@@ -0,0 +1,149 @@
+import os
+
+from langchain_core.documents import Document
+
+from dedup import deduplicate_chunks, shingle, minhash_signature, IndexDeduplicator, SIDECAR_FILE
+from index_writer import IndexCoordinator
+
+TEXT = "Working capital is the difference between current assets and current liabilities of a business"
+
+def chunk(text, source, page=None):
+    metadata = {"source": source}
+    if page is not None:
+        metadata["page"] = page
+    return Document(page_content=text, metadata=metadata)
+
+def test_identical_shingles_give_identical_signatures():
+    assert (minhash_signature(shingle(TEXT)) == minhash_signature(shingle(TEXT.upper()))).all()
+
+def test_near_duplicates_fold_into_first_chunk():
+    chunks = [
+        chunk(TEXT, "a.pdf", 1),
+        chunk("Net present value discounts future cash flows to today at the cost of capital", "a.pdf", 2),
+        chunk(TEXT + ".", "b.pdf", 4),
+        chunk(TEXT, "c.docx"),
+    ]
+
+    unique, stats = deduplicate_chunks(chunks)
+
+    assert [c.metadata["source"] for c in unique] == ["a.pdf", "a.pdf"]
+    assert unique[0].metadata["duplicate_count"] == 2
+    assert unique[0].metadata["duplicate_sources"] == "b.pdf#page=4; c.docx"
+    assert "duplicate_count" not in unique[1].metadata
+    assert stats["input_chunks"] == 4
+    assert stats["unique_chunks"] == 2
+    assert stats["duplicates_removed"] == 2
+    assert stats["dedup_ratio"] == 0.5
+
+def test_duplicates_from_own_source_are_not_counted():
+    chunks = [chunk(TEXT, "a.pdf", 1), chunk(TEXT, "a.pdf", 1), chunk(TEXT, "b.pdf", 1), chunk(TEXT, "b.pdf", 1)]
+
+    unique, stats = deduplicate_chunks(chunks)
+
+    assert len(unique) == 1
+    assert stats["duplicates_removed"] == 3
+    assert unique[0].metadata["duplicate_count"] == 1
+    assert unique[0].metadata["duplicate_sources"] == "b.pdf#page=1"
+
+def test_empty_chunks_are_kept():
+    unique, stats = deduplicate_chunks([chunk("", "a.pdf"), chunk("", "b.pdf")])
+
+    assert len(unique) == 2
+    assert stats["duplicates_removed"] == 0
+
+def test_merge_split_results_folds_across_results():
+    from rag_core import merge_split_results
+
+    results = [
+        {"status": "success", "splits": [chunk(TEXT, "a.pdf", 1)], "failed": [], "ignored": ["x.txt"], "files": ["a.pdf"]},
+        {"status": "success", "splits": [chunk(TEXT, "b.pdf", 2)], "failed": ["c.pdf: broken"], "ignored": []},
+    ]
+
+    merged = merge_split_results(results)
+
+    assert merged["status"] == "success"
+    assert len(merged["splits"]) == 1
+    assert merged["splits"][0].metadata["duplicate_sources"] == "b.pdf#page=2"
+    assert merged["dedup"]["duplicates_removed"] == 1
+    assert merged["failed"] == ["c.pdf: broken"] and merged["ignored"] == ["x.txt"]
+
+class FakeCollection:
+    def __init__(self, records):
+        self.records = records
+
+    def count(self):
+        return len(self.records)
+
+    def get(self, ids=None, limit=None, offset=0, include=()):
+        keys = [i for i in ids if i in self.records] if ids is not None else list(self.records)[offset:offset + limit]
+        return {
+            "ids": keys,
+            "documents": [self.records[k]["text"] for k in keys],
+            "metadatas": [dict(self.records[k]["metadata"]) for k in keys]
+        }
+
+    def update(self, ids, metadatas):
+        for i, metadata in zip(ids, metadatas):
+            self.records[i]["metadata"] = metadata
+
+class FakeVectorStore:
+    """Chroma stand-in kept in memory per generation folder, shared across coordinators"""
+    stores = {}
+
+    def __init__(self, directory):
+        self._collection = FakeCollection(FakeVectorStore.stores.setdefault(directory, {}))
+
+    def add_documents(self, documents, ids=None):
+        ids = ids or [f"auto-{len(self._collection.records) + i}" for i in range(len(documents))]
+        for i, doc in zip(ids, documents):
+            self._collection.records[i] = {"text": doc.page_content, "metadata": dict(doc.metadata)}
+
+def make_coordinator(root):
+    return IndexCoordinator(root, FakeVectorStore, "test-embeddings", IndexDeduplicator)
+
+def stored(coordinator):
+    return FakeVectorStore(coordinator.current_directory())._collection.records
+
+def test_later_uploads_fold_into_indexed_chunks(tmp_path):
+    root = str(tmp_path / "index")
+    coordinator = make_coordinator(root)
+    other = "Net present value discounts future cash flows to today at the cost of capital"
+
+    assert coordinator.add_documents([chunk(TEXT, "Finance/deck.pptx", 1), chunk(other, "Finance/deck.pptx", 2)]).result(5) == 2
+    assert coordinator.add_documents([chunk(TEXT, "Accounting/deck.pptx", 1)]).result(5) == 0
+
+    # A new process picks up the signatures from the sidecar
+    restarted = make_coordinator(root)
+    assert os.path.exists(os.path.join(restarted.current_directory(), SIDECAR_FILE))
+    assert restarted.add_documents([chunk(TEXT, "Strategy/deck.pptx", 1), chunk("Something else entirely about marketing funnels and reach", "Strategy/deck.pptx", 2)]).result(5) == 1
+
+    records = list(stored(restarted).values())
+    assert len(records) == 3
+    canonical = next(r for r in records if r["text"] == TEXT)
+    assert canonical["metadata"]["duplicate_count"] == 2
+    assert canonical["metadata"]["duplicate_sources"] == "Accounting/deck.pptx#page=1; Strategy/deck.pptx#page=1"
+
+def test_missing_sidecar_is_rebuilt_from_stored_chunks(tmp_path):
+    root = str(tmp_path / "index")
+    coordinator = make_coordinator(root)
+    coordinator.add_documents([chunk(TEXT, "a.pdf", 1)]).result(5)
+    os.remove(os.path.join(coordinator.current_directory(), SIDECAR_FILE))
+
+    assert make_coordinator(root).add_documents([chunk(TEXT, "b.pdf", 3)]).result(5) == 0
+    assert len(stored(coordinator)) == 1
+
+def test_duplicates_within_one_write_batch_fold_into_the_new_chunk(tmp_path):
+    coordinator = make_coordinator(str(tmp_path / "index"))
+
+    added = coordinator.add_documents([chunk(TEXT, "a.pdf", 1), chunk(TEXT, "b.pdf", 2)]).result(5)
+
+    assert added == 1
+    (record,) = stored(coordinator).values()
+    assert record["metadata"]["duplicate_sources"] == "b.pdf#page=2"
+
+def test_reset_starts_a_fresh_signature_set(tmp_path):
+    coordinator = make_coordinator(str(tmp_path / "index"))
+    coordinator.add_documents([chunk(TEXT, "a.pdf", 1)]).result(5)
+    coordinator.clear().result(5)
+
+    assert coordinator.add_documents([chunk(TEXT, "b.pdf", 1)]).result(5) == 1
@@ -0,0 +1,174 @@
+import json
+import os
+from contextlib import contextmanager
+
+import pytest
+
+import index_snapshot
+from index_writer import IndexCoordinator
+from index_snapshot import export_snapshot, verify_snapshot, load_snapshot, import_snapshot, MANIFEST_FILE, CHUNKS_FILE
+
+class FakeCollection:
+    """Stands in for a Chroma collection, stored as JSON in the generation folder"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, "collection.json")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def count(self):
+        return len(self._load())
+
+    def get(self, limit, offset, include):
+        items = list(self._load().items())[offset:offset + limit]
+        return {
+            "ids": [i for i, _ in items],
+            "embeddings": [r["embedding"] for _, r in items],
+            "documents": [r["document"] for _, r in items],
+            "metadatas": [r["metadata"] for _, r in items]
+        }
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        records = self._load()
+        for i, e, d, m in zip(ids, embeddings, documents, metadatas):
+            records[i] = {"embedding": e, "document": d, "metadata": m}
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(records, f)
+
+class FakeStore:
+    def __init__(self, directory):
+        self._collection = FakeCollection(directory)
+
+@pytest.fixture
+def coordinator(tmp_path, monkeypatch):
+    coordinator = IndexCoordinator(str(tmp_path / "index"), FakeStore, "test-embeddings")
+
+    @contextmanager
+    def read_vectorstore():
+        with coordinator.read_lease() as directory:
+            yield FakeStore(directory)
+
+    monkeypatch.setattr(index_snapshot, "get_index_coordinator", lambda: coordinator)
+    monkeypatch.setattr(index_snapshot, "read_vectorstore", read_vectorstore)
+    monkeypatch.setattr(index_snapshot, "EMBEDDING_MODEL", "test-embeddings")
+    monkeypatch.setattr(index_snapshot, "BATCH_SIZE", 2)
+    return coordinator
+
+def seed(coordinator, prefix, count):
+    collection = FakeCollection(coordinator.current_directory())
+    collection.upsert(
+        ids=[f"{prefix}{i}" for i in range(count)],
+        embeddings=[[float(i), 0.5, -1.0] for i in range(count)],
+        documents=[f"{prefix} chunk {i}" for i in range(count)],
+        metadatas=[{"source": f"{prefix}.pdf", "page": i} for i in range(count)]
+    )
+
+def contents(coordinator):
+    return FakeCollection(coordinator.current_directory())._load()
+
+def test_export_import_round_trip(coordinator, tmp_path):
+    seed(coordinator, "a", 5)
+    snapshot_dir = str(tmp_path / "snapshot")
+    manifest = export_snapshot(snapshot_dir)
+    exported = contents(coordinator)
+    before = coordinator.current_directory()
+    seed(coordinator, "b", 3)
+
+    restored = import_snapshot(snapshot_dir)
+
+    assert manifest["count"] == 5 and manifest["dimensions"] == 3
+    assert restored == 5
+    assert coordinator.current_directory() != before
+    assert contents(coordinator) == exported
+
+def test_import_keep_existing_upserts(coordinator, tmp_path):
+    seed(coordinator, "a", 3)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+    coordinator.clear().result(5)
+    seed(coordinator, "b", 2)
+
+    import_snapshot(snapshot_dir, replace=False)
+
+    assert sorted(contents(coordinator)) == ["a0", "a1", "a2", "b0", "b1"]
+
+def test_load_snapshot_maps_embeddings(coordinator, tmp_path):
+    seed(coordinator, "a", 4)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+
+    manifest, embeddings, chunks = load_snapshot(snapshot_dir)
+
+    assert embeddings.shape == (4, 3)
+    assert not embeddings.flags.writeable
+    assert [c["id"] for c in chunks] == ["a0", "a1", "a2", "a3"]
+    assert embeddings[2][0] == 2.0
+
+def test_export_of_empty_index_fails(coordinator, tmp_path):
+    with pytest.raises(ValueError):
+        export_snapshot(str(tmp_path / "snapshot"))
+
+def test_checksum_mismatch_is_rejected(coordinator, tmp_path):
+    seed(coordinator, "a", 3)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+    with open(os.path.join(snapshot_dir, CHUNKS_FILE), "a", encoding="utf-8") as f:
+        f.write("\n")
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        verify_snapshot(snapshot_dir)
+    with pytest.raises(ValueError):
+        import_snapshot(snapshot_dir)
+    assert len(contents(coordinator)) == 3
+
+def test_missing_manifest_and_files_are_rejected(coordinator, tmp_path):
+    with pytest.raises(ValueError, match="No snapshot manifest"):
+        verify_snapshot(str(tmp_path))
+
+    seed(coordinator, "a", 2)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+    os.remove(os.path.join(snapshot_dir, CHUNKS_FILE))
+    with pytest.raises(ValueError, match="missing"):
+        verify_snapshot(snapshot_dir)
+
+def rewrite_manifest(snapshot_dir, **changes):
+    path = os.path.join(snapshot_dir, MANIFEST_FILE)
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.update(changes)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+def test_manifest_count_mismatch_is_rejected(coordinator, tmp_path):
+    seed(coordinator, "a", 3)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+    rewrite_manifest(snapshot_dir, count=4)
+
+    with pytest.raises(ValueError, match="do not match"):
+        load_snapshot(snapshot_dir)
+
+def test_unsupported_version_is_rejected(coordinator, tmp_path):
+    seed(coordinator, "a", 1)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+    rewrite_manifest(snapshot_dir, version=99)
+
+    with pytest.raises(ValueError, match="version"):
+        verify_snapshot(snapshot_dir)
+
+def test_wrong_embedding_model_is_rejected(coordinator, tmp_path):
+    seed(coordinator, "a", 2)
+    snapshot_dir = str(tmp_path / "snapshot")
+    export_snapshot(snapshot_dir)
+    before = coordinator.current_directory()
+    rewrite_manifest(snapshot_dir, embedding_model="other-embeddings")
+
+    with pytest.raises(ValueError, match="other-embeddings"):
+        import_snapshot(snapshot_dir, verify=False)
+    assert coordinator.current_directory() == before
@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from index_writer import IndexCoordinator, POINTER_FILE, INIT_LOCK_FILE, LEASE_DIR, LEASE_MAX_AGE_SECONDS
+
+class FakeStore:
+    """Stands in for Chroma: documents are appended to a JSON file in the generation folder"""
+    calls = []
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, "docs.json")
+
+    def docs(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def add_documents(self, documents):
+        FakeStore.calls.append(len(documents))
+        docs = self.docs() + list(documents)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(docs, f)
+
+@pytest.fixture
+def coordinator(tmp_path):
+    FakeStore.calls = []
+    return IndexCoordinator(str(tmp_path / "index"), FakeStore, "test-embeddings")
+
+def generations(root):
+    return sorted(n for n in os.listdir(root) if n.startswith("gen-"))
+
+def test_waiting_adds_are_merged_into_one_upsert(coordinator):
+    release = threading.Event()
+    blocker = coordinator.run(lambda store: release.wait(5))
+    futures = [coordinator.add_documents([f"doc{i}a", f"doc{i}b"]) for i in range(3)]
+    release.set()
+
+    assert blocker.result(5) is True
+    assert [f.result(5) for f in futures] == [2, 2, 2]
+    assert FakeStore.calls == [6]
+    assert len(FakeStore(coordinator.current_directory()).docs()) == 6
+
+def test_legacy_flat_index_moves_into_first_generation(tmp_path):
+    root = tmp_path / "index"
+    root.mkdir()
+    (root / "chroma.sqlite3").write_text("legacy")
+
+    coordinator = IndexCoordinator(str(root), FakeStore, "test-embeddings")
+
+    assert (root / POINTER_FILE).exists()
+    assert open(os.path.join(coordinator.current_directory(), "chroma.sqlite3")).read() == "legacy"
+
+def test_clear_keeps_previous_generation_until_next_switch(coordinator):
+    coordinator.add_documents(["a"]).result(5)
+    first = coordinator.current_directory()
+
+    coordinator.clear().result(5)
+    second = coordinator.current_directory()
+    assert second != first
+    assert FakeStore(second).docs() == []
+    assert os.path.exists(first)
+
+    coordinator.clear().result(5)
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+    assert len(generations(coordinator.root)) == 2
+
+def test_leased_generation_survives_switches(coordinator):
+    coordinator.add_documents(["a"]).result(5)
+    with coordinator.read_lease() as leased:
+        coordinator.clear().result(5)
+        coordinator.clear().result(5)
+        assert FakeStore(leased).docs() == ["a"]
+    coordinator.clear().result(5)
+
+    assert not os.path.exists(leased)
+
+def test_replace_switches_only_after_fill(coordinator):
+    coordinator.add_documents(["old"]).result(5)
+    seen_during_fill = []
+
+    def fill(store):
+        store.add_documents(["new1", "new2"])
+        with coordinator.read_lease() as directory:
+            seen_during_fill.append(FakeStore(directory).docs())
+        return 2
+
+    assert coordinator.replace(fill).result(5) == 2
+    assert seen_during_fill == [["old"]]
+    assert FakeStore(coordinator.current_directory()).docs() == ["new1", "new2"]
+
+def test_failed_replace_leaves_index_untouched(coordinator):
+    coordinator.add_documents(["old"]).result(5)
+    before = coordinator.current_directory()
+
+    def fill(store):
+        store.add_documents(["partial"])
+        raise RuntimeError("snapshot is corrupt")
+
+    with pytest.raises(RuntimeError):
+        coordinator.replace(fill).result(5)
+    assert coordinator.current_directory() == before
+    assert generations(coordinator.root) == [os.path.basename(before)]
+
+def test_switch_by_another_process_is_picked_up(tmp_path):
+    root = str(tmp_path / "index")
+    first = IndexCoordinator(root, FakeStore, "test-embeddings")
+    second = IndexCoordinator(root, FakeStore, "test-embeddings")
+    assert first.current_directory() == second.current_directory()
+
+    second.clear().result(5)
+    first.add_documents(["after reset"]).result(5)
+
+    assert first.current_directory() == second.current_directory()
+    assert FakeStore(second.current_directory()).docs() == ["after reset"]
+
+def test_processes_starting_together_share_the_first_generation(tmp_path):
+    root = tmp_path / "index"
+    root.mkdir()
+    (root / "chroma.sqlite3").write_text("legacy")
+    start = threading.Barrier(4)
+    coordinators = []
+
+    def open_index():
+        start.wait()
+        coordinators.append(IndexCoordinator(str(root), FakeStore, "test-embeddings"))
+
+    threads = [threading.Thread(target=open_index) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({c.generation for c in coordinators}) == 1
+    assert generations(str(root)) == [coordinators[0].generation]
+    assert os.path.exists(os.path.join(coordinators[0].current_directory(), "chroma.sqlite3"))
+    assert not os.path.exists(root / INIT_LOCK_FILE)
+
+def test_migration_never_moves_generation_folders(tmp_path):
+    root = tmp_path / "index"
+    (root / "gen-1").mkdir(parents=True)
+
+    coordinator = IndexCoordinator(str(root), FakeStore, "test-embeddings")
+
+    assert os.path.isdir(root / "gen-1")
+    assert not os.path.exists(os.path.join(coordinator.current_directory(), "gen-1"))
+
+def test_lease_in_another_process_survives_switches(tmp_path):
+    root = str(tmp_path / "index")
+    reader = IndexCoordinator(root, FakeStore, "test-embeddings")
+    writer = IndexCoordinator(root, FakeStore, "test-embeddings")
+
+    with reader.read_lease() as leased:
+        for _ in range(3):
+            writer.clear().result(5)
+        assert os.path.exists(leased)
+    writer.clear().result(5)
+
+    assert not os.path.exists(leased)
+    assert os.listdir(os.path.join(root, LEASE_DIR)) == []
+
+def test_stale_lease_does_not_pin_a_generation(tmp_path):
+    root = str(tmp_path / "index")
+    coordinator = IndexCoordinator(root, FakeStore, "test-embeddings")
+    first = coordinator.generation
+    os.makedirs(os.path.join(root, LEASE_DIR))
+    lease = os.path.join(root, LEASE_DIR, f"{first}.999999")
+    open(lease, "w").close()
+    old = time.time() - LEASE_MAX_AGE_SECONDS - 60
+    os.utime(lease, (old, old))
+
+    coordinator.clear().result(5)
+    coordinator.clear().result(5)
+
+    assert not os.path.exists(os.path.join(root, first))
+    assert not os.path.exists(lease)
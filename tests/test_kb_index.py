@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import kb_index
+from kb_index import get_kb_index, invalidate_kb_index, list_folders
+
+@pytest.fixture
+def kb_dir(tmp_path):
+    root = tmp_path / "knowledge_base"
+    (root / "Finance" / "Valuation").mkdir(parents=True)
+    (root / "Marketing").mkdir()
+    (root / "Finance" / "notes.pdf").write_bytes(b"x")
+    (root / "Finance" / "Valuation" / "dcf.pptx").write_bytes(b"x")
+    (root / "syllabus.docx").write_bytes(b"x")
+    invalidate_kb_index()
+    yield str(root)
+    invalidate_kb_index()
+
+def count_scans(monkeypatch):
+    calls = []
+    original = kb_index._scan_tree
+
+    def scan(kb_dir):
+        calls.append(kb_dir)
+        return original(kb_dir)
+
+    monkeypatch.setattr(kb_index, "_scan_tree", scan)
+    return calls
+
+def test_index_lists_folders_and_files(kb_dir):
+    index = get_kb_index(kb_dir)
+
+    assert index[""] == {"dirs": ["Finance", "Marketing"], "files": ["syllabus.docx"]}
+    assert index["Finance"] == {"dirs": ["Valuation"], "files": ["notes.pdf"]}
+    assert index[os.path.join("Finance", "Valuation")]["files"] == ["dcf.pptx"]
+    assert list_folders(index) == [("Finance", 0), (os.path.join("Finance", "Valuation"), 1), ("Marketing", 0)]
+
+def test_unchanged_tree_is_served_from_cache(kb_dir, monkeypatch):
+    calls = count_scans(monkeypatch)
+
+    first = get_kb_index(kb_dir)
+    second = get_kb_index(kb_dir)
+
+    assert second is first
+    assert len(calls) == 1
+
+def test_nested_changes_rebuild_the_index(kb_dir, monkeypatch):
+    calls = count_scans(monkeypatch)
+    get_kb_index(kb_dir)
+    nested = os.path.join(kb_dir, "Finance", "Valuation")
+
+    with open(os.path.join(nested, "wacc.pdf"), "wb") as f:
+        f.write(b"x")
+    with_file = get_kb_index(kb_dir)
+    os.mkdir(os.path.join(nested, "Cases"))
+    with_folder = get_kb_index(kb_dir)
+
+    assert len(calls) == 3
+    assert with_file[os.path.join("Finance", "Valuation")]["files"] == ["dcf.pptx", "wacc.pdf"]
+    assert with_folder[os.path.join("Finance", "Valuation")]["dirs"] == ["Cases"]
+    assert os.path.join("Finance", "Valuation", "Cases") in with_folder
+
+def test_removed_folder_rebuilds_the_index(kb_dir):
+    get_kb_index(kb_dir)
+    os.rmdir(os.path.join(kb_dir, "Marketing"))
+
+    assert get_kb_index(kb_dir)[""]["dirs"] == ["Finance"]
+
+def test_invalidate_forces_a_rescan(kb_dir, monkeypatch):
+    calls = count_scans(monkeypatch)
+    get_kb_index(kb_dir)
+
+    invalidate_kb_index(kb_dir)
+    get_kb_index(kb_dir)
+    invalidate_kb_index()
+    get_kb_index(kb_dir)
+
+    assert len(calls) == 3
@@ -0,0 +1,47 @@
+import argparse
+
+import rag_core
+import load_test
+from load_test import run_stage, run_load_test
+
+def test_stage_reports_latency_and_sampled_rss(monkeypatch):
+    monkeypatch.setattr(rag_core, "query_rag", lambda question: ("answer", []))
+
+    stage = run_stage(2, ["What is NPV?"], 0.3, 0.01, [], 10.0)
+
+    assert stage["sessions"] == 2
+    assert stage["answers"] > 0 and stage["errors"] == 0
+    assert stage["stage_peak_rss_mb"] is not None
+
+def make_args(**overrides):
+    args = dict(
+        stand_in=False, questions=None, upload_dir=None, stages="1", stage_seconds=0.1,
+        think_time=0.0, upload_interval=10.0, p95_target=10.0, json=None, allow_empty_index=False
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def test_empty_index_is_refused(monkeypatch, capsys):
+    stages = []
+    monkeypatch.setattr(load_test, "index_size", lambda: 0)
+    monkeypatch.setattr(load_test, "run_stage", lambda *args: stages.append(args))
+
+    run_load_test(make_args())
+
+    assert stages == []
+    assert "index is empty" in capsys.readouterr().out
+
+def test_upload_dir_is_indexed_before_the_first_stage(tmp_path, monkeypatch):
+    (tmp_path / "notes.pdf").write_bytes(b"%PDF")
+    events = []
+    monkeypatch.setattr(rag_core, "load_and_split_documents", lambda paths: events.append("index") or {"status": "success", "splits": ["chunk"]})
+    monkeypatch.setattr(rag_core, "index_documents", lambda splits: 0)
+    monkeypatch.setattr(load_test, "index_size", lambda: 1)
+    monkeypatch.setattr(load_test, "run_stage", lambda *args: events.append("stage") or {
+        "sessions": 1, "answers": 1, "errors": 0, "throughput": 1.0, "p50": 0.1, "p95": 0.1, "p99": 0.1,
+        "uploads": 0, "cpu_percent": 1.0, "stage_peak_rss_mb": None, "sample_error": ""
+    })
+
+    run_load_test(make_args(upload_dir=str(tmp_path)))
+
+    assert events == ["index", "stage"]
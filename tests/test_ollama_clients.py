@@ -0,0 +1,43 @@
+import importlib
+import threading
+
+import ollama_clients
+from ollama_clients import model_slot, BACKGROUND_CONCURRENCY
+
+def test_background_work_leaves_an_interactive_slot():
+    model = "test-model"
+    release = threading.Event()
+    held = threading.Barrier(BACKGROUND_CONCURRENCY + 1)
+
+    def background_job():
+        with model_slot(model, background=True):
+            held.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=background_job) for _ in range(BACKGROUND_CONCURRENCY)]
+    for t in threads:
+        t.start()
+    held.wait()
+    try:
+        slots = ollama_clients._get_slots(model)
+        assert not slots["background"].acquire(blocking=False)
+        assert slots["total"].acquire(blocking=False)
+        slots["total"].release()
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
+
+def test_single_slot_is_shared_with_background_work(monkeypatch):
+    monkeypatch.setenv("OLLAMA_MODEL_CONCURRENCY", "1")
+    try:
+        importlib.reload(ollama_clients)
+        assert ollama_clients.MODEL_CONCURRENCY == 1
+        assert ollama_clients.BACKGROUND_CONCURRENCY == 1
+        with ollama_clients.model_slot("single-slot-model", background=True):
+            pass
+        with ollama_clients.model_slot("single-slot-model"):
+            pass
+    finally:
+        monkeypatch.delenv("OLLAMA_MODEL_CONCURRENCY")
+        importlib.reload(ollama_clients)
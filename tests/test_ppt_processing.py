@@ -0,0 +1,43 @@
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.util import Inches
+
+from ppt_processing import create_documents_from_pptx
+
+def build_deck(path, drop_notes_body=False):
+    presentation = Presentation()
+    slide = presentation.slides.add_slide(presentation.slide_layouts[5])
+    slide.shapes.title.text = "Cash Flow"
+    box = slide.shapes.add_textbox(Inches(1), Inches(2), Inches(4), Inches(1))
+    box.text_frame.text = "Operating cash flow rose"
+    notes_slide = slide.notes_slide
+    notes_slide.notes_text_frame.text = "Mention the seasonal effect"
+    if drop_notes_body:
+        for placeholder in list(notes_slide.placeholders):
+            if placeholder.placeholder_format.type == PP_PLACEHOLDER.BODY:
+                placeholder._element.getparent().remove(placeholder._element)
+    presentation.slides.add_slide(presentation.slide_layouts[6])
+    presentation.save(path)
+
+def test_slides_become_documents_with_notes(tmp_path):
+    path = str(tmp_path / "deck.pptx")
+    build_deck(path)
+
+    docs = create_documents_from_pptx(path)
+
+    assert len(docs) == 1
+    assert docs[0].metadata["slide_number"] == 1
+    assert docs[0].metadata["title"] == "Cash Flow"
+    assert docs[0].metadata["has_notes"] is True
+    assert "Operating cash flow rose" in docs[0].page_content
+    assert "Speaker notes:\nMention the seasonal effect" in docs[0].page_content
+
+def test_notes_page_without_body_placeholder(tmp_path):
+    path = str(tmp_path / "deck.pptx")
+    build_deck(path, drop_notes_body=True)
+
+    docs = create_documents_from_pptx(path)
+
+    assert len(docs) == 1
+    assert docs[0].metadata["has_notes"] is False
+    assert "Speaker notes" not in docs[0].page_content
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+
+from aiohttp.test_utils import TestClient, TestServer
+from langchain_core.documents import Document
+
+import query_service
+from query_service import QueryService, create_app
+
+def run_with_client(service, scenario):
+    async def main():
+        client = TestClient(TestServer(create_app(service)))
+        await client.start_server()
+        try:
+            return await scenario(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+def test_identical_questions_share_one_answer(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def retrieve(question):
+        calls.append(question)
+        release.wait(5)
+        return [Document(page_content="NPV discounts cash flows.", metadata={"source": "notes.pdf"})]
+
+    monkeypatch.setattr(query_service, "retrieve_documents", retrieve)
+    monkeypatch.setattr(query_service, "stream_answer", lambda question, docs: iter(["Net ", "present value"]))
+    service = QueryService(max_active=2, max_queued=2)
+
+    async def scenario(client):
+        first = asyncio.ensure_future(client.post("/query", json={"question": "What is NPV?"}))
+        second = asyncio.ensure_future(client.post("/query", json={"question": "  what is   npv? "}))
+        while service.coalesced < 1:
+            await asyncio.sleep(0.01)
+        release.set()
+        return [await (await r).json() for r in (first, second)]
+
+    answers = run_with_client(service, scenario)
+
+    assert calls == ["What is NPV?"]
+    assert answers[0] == answers[1]
+    assert answers[0]["answer"] == "Net present value"
+    assert answers[0]["sources"][0]["metadata"] == {"source": "notes.pdf"}
+
+def test_full_service_answers_503(monkeypatch):
+    release = threading.Event()
+
+    def retrieve(question):
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(query_service, "retrieve_documents", retrieve)
+    monkeypatch.setattr(query_service, "stream_answer", lambda question, docs: iter(["ok"]))
+    service = QueryService(max_active=1, max_queued=1)
+
+    async def scenario(client):
+        admitted = [asyncio.ensure_future(client.post("/query", json={"question": f"Question {i}?"})) for i in range(2)]
+        while service.admitted < 2:
+            await asyncio.sleep(0.01)
+        rejected = await client.post("/query", json={"question": "One more?"})
+        release.set()
+        statuses = [(await r).status for r in admitted]
+        return rejected.status, rejected.headers.get("Retry-After"), statuses
+
+    status, retry_after, statuses = run_with_client(service, scenario)
+
+    assert status == 503
+    assert retry_after == str(query_service.RETRY_AFTER_SECONDS)
+    assert statuses == [200, 200]
+
+def test_non_object_bodies_are_rejected():
+    async def scenario(client):
+        responses = [
+            await client.post("/query", json=["What is NPV?"]),
+            await client.post("/query", json={"question": 42}),
+            await client.post("/ingest", json="knowledge_base/notes.pdf"),
+            await client.post("/ingest", json={"paths": "knowledge_base/notes.pdf"}),
+        ]
+        return [r.status for r in responses]
+
+    assert run_with_client(QueryService(), scenario) == [400, 400, 400, 400]
+
+def test_ingest_rejects_paths_outside_knowledge_base(tmp_path, monkeypatch):
+    kb_dir = tmp_path / "knowledge_base"
+    (kb_dir / "Finance").mkdir(parents=True)
+    inside = kb_dir / "Finance" / "notes.pdf"
+    inside.write_bytes(b"%PDF")
+    outside = tmp_path / "secret.pdf"
+    outside.write_bytes(b"%PDF")
+    monkeypatch.setattr(query_service, "KB_DIR", str(kb_dir))
+    ingested = []
+    monkeypatch.setattr(QueryService, "_run_ingest", lambda self, paths: ingested.extend(paths) or {"status": "success"})
+
+    async def scenario(client):
+        escaping = await client.post("/ingest", json={"paths": [str(inside), str(kb_dir / ".." / "secret.pdf")]})
+        accepted = await client.post("/ingest", json={"paths": [str(inside)]})
+        return escaping.status, (await escaping.json())["rejected"], accepted.status
+
+    status, rejected, accepted = run_with_client(QueryService(), scenario)
+
+    assert status == 400
+    assert rejected == [str(kb_dir / ".." / "secret.pdf")]
+    assert accepted == 200
+    assert ingested == [str(inside.resolve())]
+
+def test_reset_clears_through_the_service(monkeypatch):
+    calls = []
+    monkeypatch.setattr(query_service, "clear_database", lambda: calls.append(True) or "Database cleared.")
+
+    async def scenario(client):
+        response = await client.post("/reset", json={})
+        return response.status, await response.json()
+
+    status, body = run_with_client(QueryService(), scenario)
+
+    assert status == 200
+    assert body == {"status": "success", "message": "Database cleared."}
+    assert calls == [True]
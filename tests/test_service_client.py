@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+
+import query_service
+from query_service import QueryService, create_app
+from service_client import ingest_remote, reset_remote, query_remote
+
+@pytest.fixture
+def service_url(tmp_path, monkeypatch):
+    kb_dir = tmp_path / "knowledge_base"
+    kb_dir.mkdir()
+    monkeypatch.setattr(query_service, "KB_DIR", str(kb_dir))
+    monkeypatch.setattr(query_service, "clear_database", lambda: "Database cleared.")
+    monkeypatch.setattr(QueryService, "_run_ingest", lambda self, paths: {"status": "success", "chunks": len(paths), "failed": [], "ignored": []})
+
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    state = {}
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        state["runner"] = web.AppRunner(create_app(QueryService()))
+        loop.run_until_complete(state["runner"].setup())
+        site = web.TCPSite(state["runner"], "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        state["port"] = state["runner"].addresses[0][1]
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    started.wait(5)
+    yield f"http://127.0.0.1:{state['port']}", kb_dir
+    asyncio.run_coroutine_threadsafe(state["runner"].cleanup(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+
+def test_ingest_and_reset_go_through_the_service(service_url):
+    url, kb_dir = service_url
+    document = kb_dir / "notes.pdf"
+    document.write_bytes(b"%PDF")
+
+    assert ingest_remote(url, [str(document)])["chunks"] == 1
+    assert reset_remote(url) == {"status": "success", "message": "Database cleared."}
+
+def test_service_errors_carry_the_service_message(service_url):
+    url, _ = service_url
+
+    with pytest.raises(RuntimeError, match="400.*inside"):
+        ingest_remote(url, ["/etc/passwd"])
+    with pytest.raises(RuntimeError, match="400.*question"):
+        query_remote(url, "   ")
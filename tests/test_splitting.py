@@ -0,0 +1,94 @@
+from langchain_core.documents import Document
+
+import splitting
+from splitting import split_sections, split_document, split_documents, count_tokens, CHUNK_TOKENS
+
+def test_title_case_line_after_heading_stays_in_section():
+    text = "Working Capital\nJohn Smith\nCurrent assets minus current liabilities.\n\nCash Flow\nOperating cash flow rose."
+
+    sections = split_sections(text)
+
+    assert [heading for heading, _ in sections] == ["Working Capital", "Cash Flow"]
+    assert sections[0][1].startswith("Working Capital\nJohn Smith")
+
+def test_title_case_line_mid_paragraph_is_not_a_heading():
+    text = "Revenue grew in the quarter, driven by\nNorth American Sales\nand lower returns."
+
+    assert split_sections(text) == [("", text)]
+
+def test_heading_after_finished_sentence_starts_section():
+    text = "Intro text ends here.\n2.1 Liquidity Ratios\nThe current ratio compares assets to liabilities."
+
+    sections = split_sections(text)
+
+    assert [heading for heading, _ in sections] == ["", "2.1 Liquidity Ratios"]
+
+def test_small_sections_are_packed_with_first_heading():
+    doc = Document(page_content="Assets\nCash and receivables.\n\nLiabilities\nPayables and loans.", metadata={"source": "notes.pdf"})
+
+    chunks = split_document(doc)
+
+    assert len(chunks) == 1
+    assert chunks[0].metadata["section"] == "Assets"
+
+def test_oversized_section_repeats_heading_on_each_piece():
+    body = " ".join(f"Sentence number {i} about discounted cash flow." for i in range(200))
+    doc = Document(page_content=f"Valuation Methods\n{body}", metadata={"source": "notes.docx"})
+
+    chunks = split_document(doc)
+
+    assert len(chunks) > 1
+    assert all(c.page_content.startswith("Valuation Methods\n") for c in chunks)
+    assert all(c.metadata["section"] == "Valuation Methods" for c in chunks)
+    assert all(count_tokens(c.page_content) <= CHUNK_TOKENS + count_tokens("Valuation Methods\n") for c in chunks)
+
+def test_producer_sized_types_are_never_split():
+    long_text = "row | value\n" * 2000
+    docs = [
+        Document(page_content=long_text, metadata={"source": "sheet.xlsx", "type": "table_chunk"}),
+        Document(page_content=long_text, metadata={"source": "sheet.xlsx", "type": "table_summary"}),
+        Document(page_content=long_text, metadata={"source": "chart.png", "type": "image"}),
+    ]
+
+    assert split_documents(docs) == docs
+
+def test_other_types_use_recursive_splitter():
+    doc = Document(page_content="word " * 2000, metadata={"source": "deck.pptx", "type": "slide"})
+
+    chunks = split_document(doc)
+
+    assert len(chunks) > 1
+    assert all(count_tokens(c.page_content) <= CHUNK_TOKENS for c in chunks)
+    assert split_document(Document(page_content="  ", metadata={"source": "deck.pptx"})) == []
+
+class FakeTokenizer:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, disallowed_special=()):
+        self.calls += 1
+        return text.split()
+
+def test_token_counts_use_the_tokenizer_and_are_memoised(monkeypatch):
+    tokenizer = FakeTokenizer()
+    monkeypatch.setattr(splitting, "get_tokenizer", lambda: tokenizer)
+    count_tokens.cache_clear()
+    try:
+        assert count_tokens("present value of future cash flows") == 6
+        assert count_tokens("present value of future cash flows") == 6
+        assert tokenizer.calls == 1
+    finally:
+        count_tokens.cache_clear()
+
+def test_missing_encoding_falls_back_to_estimate_without_download(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(splitting, "TOKENIZER_CACHE_DIR", str(tmp_path))
+    splitting.get_tokenizer.cache_clear()
+    count_tokens.cache_clear()
+    try:
+        assert splitting.get_tokenizer() is None
+        assert "Warning: Tokenizer encoding not found" in capsys.readouterr().out
+        assert count_tokens("x" * 10) == 3
+        assert splitting.tokenizer_file().startswith(str(tmp_path))
+    finally:
+        splitting.get_tokenizer.cache_clear()
+        count_tokens.cache_clear()
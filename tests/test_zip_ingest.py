@@ -0,0 +1,57 @@
+import io
+import os
+import zipfile
+
+from langchain_core.documents import Document
+
+import zip_ingest
+from zip_ingest import iter_zip_members, load_and_split_zip
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+def test_unsafe_member_is_recorded_and_extraction_continues(tmp_path):
+    archive = make_zip({"../escape.pdf": b"x", "docs/report.pdf": b"y"})
+    target = tmp_path / "kb"
+    ignored, failed = [], []
+
+    extracted = list(iter_zip_members(archive, str(target), ignored=ignored, failed=failed))
+
+    assert extracted == [os.path.realpath(target / "docs" / "report.pdf")]
+    assert len(failed) == 1 and failed[0].startswith("escape.pdf:")
+    assert not (tmp_path / "escape.pdf").exists()
+
+def test_unsupported_members_are_skipped_before_writing(tmp_path):
+    archive = make_zip({"notes.txt": b"x", "__MACOSX/._slides.pptx": b"y", "._photo.png": b"z"})
+    ignored = []
+
+    extracted = list(iter_zip_members(archive, str(tmp_path), ignored=ignored))
+
+    assert extracted == []
+    assert sorted(ignored) == ["._photo.png", "._slides.pptx", "notes.txt"]
+    assert os.listdir(tmp_path) == []
+
+def test_load_and_split_zip_reports_only_ignored_members(tmp_path):
+    archive = make_zip({"notes.txt": b"x"})
+
+    result = load_and_split_zip(archive, str(tmp_path))
+
+    assert result["status"] == "error"
+    assert result["ignored"] == ["notes.txt"]
+    assert result["files"] == []
+
+def test_load_and_split_zip_loads_extracted_members(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_ingest, "load_file", lambda path: [Document(page_content="Quarterly revenue grew.", metadata={"source": path, "type": "image"})])
+    archive = make_zip({"../escape.png": b"x", "a/chart.png": b"y", "readme.md": b"z"})
+
+    result = load_and_split_zip(archive, str(tmp_path))
+
+    assert result["status"] == "success"
+    assert len(result["splits"]) == 1
+    assert result["ignored"] == ["readme.md"]
+    assert len(result["failed"]) == 1
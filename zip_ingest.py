@@ -0,0 +1,107 @@
+"""
+Streaming ZIP ingestion.
+
+Members are read straight from the uploaded archive and written into the
+target folder one at a time, without a temporary copy of the archive.
+Unsupported members are skipped before anything is written, and only the
+members just extracted are loaded - not the rest of the target folder.
+Each extracted member is handed to a worker pool for parsing while the next
+one is being extracted.
+"""
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from rag_core import ALLOWED_EXTENSIONS, load_file, split_documents, split_and_deduplicate
+
+MAX_WORKERS = 2
+
+def _safe_member_path(target_dir, member_name):
+    """Resolve a member path inside target_dir, rejecting paths that escape it"""
+    target_root = os.path.realpath(target_dir)
+    dest = os.path.realpath(os.path.join(target_root, member_name))
+    if os.path.commonpath([target_root, dest]) != target_root:
+        raise ValueError(f"Unsafe path in archive: {member_name}")
+    return dest
+
+def iter_zip_members(zip_source, target_dir, ignored=None, failed=None):
+    """
+    Stream supported members of a ZIP archive into target_dir.
+    zip_source can be a path or any seekable file-like object (such as a
+    Streamlit UploadedFile). Yields the path of each extracted file.
+    Names of skipped members are appended to ignored, and members with
+    unsafe paths to failed, if given; extraction continues with the rest.
+    """
+    with zipfile.ZipFile(zip_source, "r") as zf:
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+
+            filename = os.path.basename(info.filename)
+            ext = os.path.splitext(filename)[1].lower()
+            # Skip unsupported files and macOS resource forks before writing anything
+            if ext not in ALLOWED_EXTENSIONS or filename.startswith("._") or "__MACOSX/" in info.filename:
+                if ignored is not None:
+                    ignored.append(filename)
+                continue
+
+            try:
+                dest = _safe_member_path(target_dir, info.filename)
+            except ValueError as e:
+                if failed is not None:
+                    failed.append(f"{filename}: {str(e)}")
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with zf.open(info) as src, open(dest, "wb") as out:
+                shutil.copyfileobj(src, out)
+            yield dest
+
+def load_and_split_zip(zip_source, target_dir, progress_callback=None, max_workers=MAX_WORKERS, deduplicate=True):
+    """
+    Extract a ZIP archive into target_dir and load only its members.
+    Returns the same result shape as load_and_split_documents, plus
+    'files' with the paths that were extracted.
+    """
+    ignored_files = []
+    failed_files = []
+    extracted = []
+    all_docs = []
+
+    with zipfile.ZipFile(zip_source, "r") as zf:
+        total_files = sum(1 for info in zf.infolist() if not info.is_dir())
+    if hasattr(zip_source, "seek"):
+        zip_source.seek(0)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = []
+        # Parsing of each member overlaps with extraction of the next one
+        for file_path in iter_zip_members(zip_source, target_dir, ignored=ignored_files, failed=failed_files):
+            extracted.append(file_path)
+            futures.append((file_path, executor.submit(load_file, file_path)))
+
+        for i, (file_path, future) in enumerate(futures):
+            filename = os.path.basename(file_path)
+            if progress_callback:
+                progress_callback(i + len(ignored_files) + len(failed_files), total_files, filename)
+            try:
+                all_docs.extend(future.result())
+            except Exception as e:
+                failed_files.append(f"{filename}: {str(e)}")
+
+    if not all_docs:
+        return {"status": "error", "message": "No valid documents loaded.", "failed": failed_files, "ignored": ignored_files, "splits": [], "files": extracted}
+
+    if not deduplicate:
+        return {"status": "success", "splits": split_documents(all_docs), "failed": failed_files, "ignored": ignored_files, "files": extracted}
+
+    splits, dedup_stats = split_and_deduplicate(all_docs)
+
+    return {
+        "status": "success",
+        "splits": splits,
+        "failed": failed_files,
+        "ignored": ignored_files,
+        "files": extracted,
+        "dedup": dedup_stats
+    }